@@ -1,2 +1,3 @@
 from .agent import Agent
-from .maze_agent import QLearningAgent, ValueIterationAgent, PolicyIterationAgent
+from .replay_buffer import ReplayBuffer
+from .maze_agent import QLearningAgent, DynaQAgent, ValueIterationAgent, PolicyIterationAgent
@@ -1,4 +1,5 @@
 import gymnasium as gym
+import numpy as np
 from abc import ABC, abstractmethod
 
 class Agent(ABC):
@@ -10,6 +11,37 @@ class Agent(ABC):
         self.env = env
         self.discount_factor = discount_factor
 
+    @property
+    def compact(self) -> bool:
+        """Whether the environment uses compact dtypes (see MazeEnv)."""
+        return getattr(self.env.unwrapped, "compact", False)
+
+    @property
+    def value_dtype(self):
+        """dtype of the value arrays, float32 on compact environments."""
+        return np.float32 if self.compact else np.float64
+
+    @property
+    def policy_dtype(self):
+        """dtype of the policy arrays, uint8 on compact environments."""
+        return np.uint8 if self.compact else np.int64
+
     @abstractmethod
     def get_action(self, obs: tuple[int, int, bool]) -> int:
         pass
+
+    @abstractmethod
+    def state_dict(self) -> dict:
+        """Returns everything needed to rebuild the trained agent: NumPy arrays and JSON values,
+        with the constructor arguments under "hyperparameters" (see checkpoint.save_agent)."""
+        pass
+
+    @abstractmethod
+    def load_state_dict(self, state: dict):
+        """Restores the agent from the output of state_dict."""
+        pass
+
+    @abstractmethod
+    def replan(self, edit):
+        """Carries the agent over to its environment after env.apply_edits returned `edit`."""
+        pass
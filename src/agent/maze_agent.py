@@ -1,18 +1,21 @@
-from collections import defaultdict
+import heapq
 
-import gymnasium as gym
 import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
 
 from agent import Agent
-from config import n_episodes
-from environment import MazeEnv
+from agent.replay_buffer import ReplayBuffer
+from environment import MazeEdit, MazeEnv, aggregate_blocks, coarse_goal_distance
+from metrics import MetricsSink, RecordEpisodeMetrics
 
 
 class QLearningAgent(Agent):
     def __init__(self, env: MazeEnv, learning_rate: float,
                  initial_epsilon: float, epsilon_decay: float,
-                 final_epsilon: float, discount_factor: float = 0.95):
-        """Initialize a Reinforcement Learning agent with an empty dictionary
+                 final_epsilon: float, discount_factor: float = 0.95,
+                 dtype=None, metrics_path: str | None = None):
+        """Initialize a Reinforcement Learning agent with a zero table
         of state-action values (q_values), a learning rate and an epsilon.
 
         Args:
@@ -21,16 +24,24 @@ class QLearningAgent(Agent):
             epsilon_decay: The decay for epsilon
             final_epsilon: The final epsilon value
             discount_factor: The discount factor for computing the Q-value
+            dtype: The dtype of the Q-table, None for the agent's value_dtype (float32 on compact environments)
+            metrics_path: Directory the raw episode returns, lengths and TD errors are
+                streamed to, None keeps only their running summaries (see metrics.MetricsSink)
         """
         super().__init__(env, discount_factor)
-        self.env = gym.wrappers.RecordEpisodeStatistics(env, buffer_length=n_episodes)
-        self.q_values = defaultdict(lambda: np.zeros(env.action_space.n))
+        self.metrics = MetricsSink(metrics_path)
+        self.env = RecordEpisodeMetrics(env, self.metrics)
+        # One row per state, rows are looked up through env.state_index
+        self.state_index = env.state_index
+        self.q_values = np.zeros((len(env.state_coords), env.action_space.n),
+                                 dtype=self.value_dtype if dtype is None else dtype)
         self.lr = learning_rate
+        self.initial_epsilon = initial_epsilon
         self.epsilon = initial_epsilon
         self.epsilon_decay = epsilon_decay
         self.final_epsilon = final_epsilon
 
-        self.training_error = []
+        self.training_error = self.metrics["training_error"]
 
     def get_action(self, obs: tuple[int, int, bool]) -> int:
         """
@@ -42,7 +53,7 @@ class QLearningAgent(Agent):
             return self.env.action_space.sample()
         # with probability (1 - epsilon) act greedily (exploit)
         else:
-            return int(np.argmax(self.q_values[obs]))
+            return int(np.argmax(self.q_values[self.state_index[obs]]))
 
     def update(
         self,
@@ -53,30 +64,385 @@ class QLearningAgent(Agent):
         next_obs: tuple[int, int, bool],
     ):
         """Updates the Q-value of an action."""
-        future_q_value = (not terminated) * np.max(self.q_values[next_obs])
+        state = self.state_index[obs]
+        future_q_value = (not terminated) * self.q_values[self.state_index[next_obs]].max()
         temporal_difference = (
-            reward + self.discount_factor * future_q_value - self.q_values[obs][action]
+            reward + self.discount_factor * future_q_value - self.q_values[state, action]
         )
 
-        self.q_values[obs][action] = (
-            self.q_values[obs][action] + self.lr * temporal_difference
-        )
+        self.q_values[state, action] += self.lr * temporal_difference
         self.training_error.append(temporal_difference)
 
+    def get_actions(self, states: np.ndarray) -> np.ndarray:
+        """Epsilon-greedy actions for a batch of flat state indices."""
+        greedy = np.argmax(self.q_values[states], axis=1)
+        explore = np.random.random(len(states)) < self.epsilon
+        return np.where(explore, np.random.randint(self.env.action_space.n, size=len(states)), greedy)
+
+    def update_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        terminated: np.ndarray,
+        next_states: np.ndarray,
+    ):
+        """Updates the Q-values of a batch of transitions given as flat state indices.
+
+        Targets are computed from the current table. A (state, action) pair that occurs
+        k times in the batch receives its k updates as if they were applied one after
+        another: Q <- (1 - lr)^k Q + sum_i lr (1 - lr)^(k - 1 - i) target_i.
+        """
+        self.training_error.extend(self._update_batch(states, actions, rewards, terminated, next_states))
+
+    def _update_batch(self, states, actions, rewards, terminated, next_states) -> np.ndarray:
+        """update_batch without recording the training error, returns the temporal differences."""
+        future_q_values = np.where(terminated, 0, self.q_values[next_states].max(axis=1))
+        targets = rewards + self.discount_factor * future_q_values
+        temporal_differences = targets - self.q_values[states, actions]
+
+        keys = states * self.q_values.shape[1] + actions
+        order = np.argsort(keys, kind="stable")
+        unique_keys, first, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        remaining = np.repeat(counts, counts) - 1 - (np.arange(len(keys)) - np.repeat(first, counts))
+        weighted_targets = self.lr * (1 - self.lr) ** remaining * targets[order]
+
+        flat_q_values = self.q_values.reshape(-1)
+        flat_q_values[unique_keys] = ((1 - self.lr) ** counts * flat_q_values[unique_keys]
+                                      + np.add.reduceat(weighted_targets, first))
+        return temporal_differences
+
     def decay_epsilon(self):
         self.epsilon = max(self.final_epsilon, self.epsilon - self.epsilon_decay)
 
+    def greedy_policy(self) -> np.ndarray:
+        """Greedy action of every state, indexed like env.state_space."""
+        return np.argmax(self.q_values, axis=1)
+
+    def greedy_values(self) -> np.ndarray:
+        """Greedy value max_a Q(s, a) of every state, indexed like env.state_space."""
+        return np.max(self.q_values, axis=1)
+
+    def state_dict(self) -> dict:
+        hyperparameters = dict(learning_rate=self.lr, initial_epsilon=self.initial_epsilon,
+                               epsilon_decay=self.epsilon_decay, final_epsilon=self.final_epsilon,
+                               discount_factor=self.discount_factor, dtype=self.q_values.dtype.name,
+                               metrics_path=self.metrics.path)
+        return dict(hyperparameters=hyperparameters, epsilon=self.epsilon,
+                    q_values=self.q_values, policy=self.greedy_policy(), **self.metrics.state_dict())
+
+    def load_state_dict(self, state: dict):
+        self.q_values = state["q_values"]
+        self.epsilon = state["epsilon"]
+        self.metrics.load_state_dict(state)
+
+    def replan(self, edit: MazeEdit):
+        """Keeps the learned Q-values of the states that are still free, new states start at zero."""
+        self.state_index = self.env.unwrapped.state_index
+        self.q_values = edit.remap(self.q_values)
+
+
+class DynaQAgent(QLearningAgent):
+    def __init__(self, env: MazeEnv, learning_rate: float,
+                 initial_epsilon: float, epsilon_decay: float,
+                 final_epsilon: float, discount_factor: float = 0.95,
+                 dtype=None, metrics_path: str | None = None,
+                 planning_steps: int = 10, buffer_capacity: int = 100_000, planning_batch: int = 256):
+        """Q-learning with Dyna-Q planning. Every real transition also goes into a ReplayBuffer and
+        into a tabular model of the maze that counts, for every (s, a), how often each of the five
+        possible next states (the four neighbours and s itself) followed, and the rewards seen.
+        Every real update owes planning_steps simulated ones: (s, a) pairs drawn from the replay
+        buffer, with next states and rewards drawn from the model. They are learned from in batched
+        updates of at least planning_batch transitions, so the per-call overhead of NumPy is paid
+        once per batch rather than once per real step.
+
+        Args:
+            env: The training environment
+            initial_epsilon: The initial epsilon value
+            epsilon_decay: The decay for epsilon
+            final_epsilon: The final epsilon value
+            discount_factor: The discount factor for computing the Q-value
+            dtype: The dtype of the Q-table, None for the agent's value_dtype (float32 on compact environments)
+            metrics_path: Directory the episode metrics are streamed to, see QLearningAgent
+            planning_steps: Simulated updates per real transition
+            buffer_capacity: Number of recent transitions the planned (s, a) pairs are drawn from
+            planning_batch: Smallest number of simulated updates made at once
+        """
+        super().__init__(env, learning_rate, initial_epsilon, epsilon_decay, final_epsilon,
+                         discount_factor, dtype, metrics_path)
+        self.planning_steps = planning_steps
+        self.planning_batch = planning_batch
+        self.pending_planning = 0
+        self.replay = ReplayBuffer(buffer_capacity)
+        self._build_targets()
+        self.model_counts = np.zeros(self.targets.shape[:1] + (env.action_space.n, self.targets.shape[1]),
+                                     dtype=np.int32)
+        self.model_rewards = np.zeros(self.model_counts.shape, dtype=np.float32)  # reward sums
+
+    def _build_targets(self):
+        # possible next states of every state: its four neighbours (-1 behind walls) and itself
+        model = self.env.unwrapped.get_transition_model()
+        self.targets = np.concatenate([model.neighbors, np.arange(model.n_states)[:, None]], axis=1)
+
+    def update(
+        self,
+        obs: tuple[int, int, bool],
+        action: int,
+        reward: float,
+        terminated: bool,
+        next_obs: tuple[int, int, bool],
+    ):
+        """Updates the Q-value of an action, records the transition and plans planning_steps updates."""
+        super().update(obs, action, reward, terminated, next_obs)
+        state, next_state = self.state_index[obs], self.state_index[next_obs]
+        outcome = int(np.argmax(self.targets[state] == next_state))
+        self.model_counts[state, action, outcome] += 1
+        self.model_rewards[state, action, outcome] += reward
+        self.replay.add(state, action, reward, terminated, next_state)
+        self._schedule_planning(self.planning_steps)
+
+    def update_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        terminated: np.ndarray,
+        next_states: np.ndarray,
+    ):
+        """Updates the Q-values of a batch of transitions, records them and plans planning_steps updates per transition."""
+        super().update_batch(states, actions, rewards, terminated, next_states)
+        outcomes = np.argmax(self.targets[states] == next_states[:, None], axis=1)
+        np.add.at(self.model_counts, (states, actions, outcomes), 1)
+        np.add.at(self.model_rewards, (states, actions, outcomes), rewards)
+        self.replay.add_batch(states, actions, rewards, terminated, next_states)
+        self._schedule_planning(self.planning_steps * len(states))
+
+    def _schedule_planning(self, n_updates: int):
+        self.pending_planning += n_updates
+        if self.pending_planning >= self.planning_batch:
+            self.plan(self.pending_planning)
+            self.pending_planning = 0
+
+    def plan(self, n_updates: int):
+        """Learns from `n_updates` transitions simulated by the model, in a single batched update."""
+        if not n_updates or not len(self.replay):
+            return
+        states, actions = self.replay.sample(n_updates)[:2]
+        counts = self.model_counts[states, actions]
+        cumulative = np.cumsum(counts, axis=1)
+        draws = np.random.random(n_updates) * cumulative[:, -1]
+        outcomes = (draws[:, None] >= cumulative).sum(axis=1)
+        rewards = self.model_rewards[states, actions, outcomes] / counts[np.arange(n_updates), outcomes]
+        # episodes end on a time limit, not in a state, so simulated transitions never terminate
+        self._update_batch(states, actions, rewards, np.zeros(n_updates, dtype=bool),
+                           self.targets[states, outcomes])
+
+    def state_dict(self) -> dict:
+        state = super().state_dict()
+        state["hyperparameters"].update(planning_steps=self.planning_steps, buffer_capacity=self.replay.capacity,
+                                        planning_batch=self.planning_batch)
+        return dict(state, pending_planning=self.pending_planning, model_counts=self.model_counts, model_rewards=self.model_rewards,
+                    **self.replay.state_dict())
+
+    def load_state_dict(self, state: dict):
+        super().load_state_dict(state)
+        self.model_counts = state["model_counts"]
+        self.model_rewards = state["model_rewards"]
+        self.pending_planning = state["pending_planning"]
+        self.replay.load_state_dict(state)
+
+    def replan(self, edit: MazeEdit):
+        """Carries the Q-values, the model and the replay buffer over; the model forgets the states whose transitions changed."""
+        super().replan(edit)
+        self._build_targets()
+        self.model_counts = edit.remap(self.model_counts)
+        self.model_rewards = edit.remap(self.model_rewards)
+        self.model_counts[edit.dirty] = 0
+        self.model_rewards[edit.dirty] = 0
+        self.replay.remap(edit)
+
 
 class ValueIterationAgent(Agent):
-    def __init__(self, env: MazeEnv, discount_factor=0.95, theta=1e-2):
+    BACKENDS = ("loop", "vectorized", "prioritized", "hierarchical")
+
+    def __init__(self, env: MazeEnv, discount_factor=0.95, theta=1e-2, backend="vectorized", block_size=8):
+        """
+        Args:
+            env: The maze environment
+            discount_factor: The discount factor
+            theta: Threshold on the largest value change to stop the iteration
+            backend: "loop" backs states up one by one in place (Gauss-Seidel),
+                "vectorized" backs up all states at once through the transition model (Jacobi),
+                "prioritized" backs up one state at a time in order of its Bellman residual
+                (prioritized sweeping, see prioritized_sweeping),
+                "hierarchical" backs up coarse blocks of states in order of their distance
+                from the goal on the coarsened maze (see hierarchical_sweeping)
+            block_size: Side of the maze blocks aggregated into coarse states by the "hierarchical" backend
+        """
         super().__init__(env, discount_factor)
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown value iteration backend: {backend}")
         self.env = env
         self.discount_factor = discount_factor  # Discount factor
         self.theta = theta  # Threshold to stop the iteration
-        
+        self.backend = backend
+        self.block_size = block_size
+        self._levels = None
+
         # Initialize value function for each state.
-        self.value_function = np.zeros(env.maze.shape)
+        self.value_function = np.zeros(env.maze.shape, dtype=self.value_dtype)
         self.training_deltas = []
+        self.n_backups = 0
+
+    def sweep(self):
+        """
+        Backs up every state once and returns the largest change of the value function
+        """
+        self.n_backups += len(self.env.state_coords)
+        if self.backend == "loop":
+            delta = 0
+            for state in self.env.state_space:
+                v = self.value_function[state]
+                self.value_function[state] = self.compute_action_value(state)
+                delta = max(delta, abs(v - self.value_function[state]))
+            return delta
+
+        model = self.env.get_transition_model()
+        rows, cols = self.env.state_coords.T
+        values = self.value_function[rows, cols]
+        new_values = model.q_values(values, self.discount_factor).max(axis=1)
+        self.value_function[rows, cols] = new_values
+        return float(np.max(np.abs(new_values - values)))
+
+    def prioritized_sweeping(self, max_backups=None, states=None):
+        """
+        Asynchronous value iteration: states sit in a priority queue keyed by their Bellman residual
+        |max_a Q(s, a) - V(s)|, and after every backup only the predecessors of the backed up state are
+        re-scored. Stops when every residual is below theta, the same tolerance as a full sweep.
+        An untouched value function is first set to the pessimistic bound min R / (1 - gamma), where
+        only states near the goal have a residual, so backups spread out from the goal instead of
+        every state being backed up ~log(theta) / log(gamma) times.
+        Appends the largest queued residual to training_deltas every |S| backups.
+
+        Args:
+            max_backups: Stop after this many backups, None for no limit
+            states: Only these states are scored and queued at the start, the others are assumed to be
+                within theta already (see replan); None scores every state
+        """
+        model = self.env.get_transition_model()
+        predecessors = model.predecessors()
+        rows, cols = self.env.state_coords.T
+        if self.n_backups == 0 and not self.value_function.any():
+            self.value_function[rows, cols] = model.R.min() / (1 - self.discount_factor)
+        values = self.value_function[rows, cols]
+
+        if states is None:
+            residuals = np.abs(model.q_values(values, self.discount_factor).max(axis=1) - values)
+        else:
+            residuals = np.zeros(model.n_states)
+            residuals[states] = np.abs(model.states_q_values(states, values, self.discount_factor).max(axis=1)
+                                       - values[states])
+        priority = np.where(residuals >= self.theta, residuals, 0.0)
+        queue = [(-residual, state) for state, residual in enumerate(priority.tolist()) if residual > 0]
+        heapq.heapify(queue)
+
+        backups = 0
+        while queue and (max_backups is None or backups < max_backups):
+            residual, state = heapq.heappop(queue)
+            if -residual != priority[state]:
+                continue  # outdated entry
+            priority[state] = 0.0
+            values[state] = model.state_q_values(state, values, self.discount_factor).max()
+            backups += 1
+
+            for predecessor in predecessors.indices[predecessors.indptr[state]:predecessors.indptr[state + 1]]:
+                residual = abs(model.state_q_values(predecessor, values, self.discount_factor).max()
+                               - values[predecessor])
+                if residual >= self.theta:
+                    if residual != priority[predecessor]:
+                        priority[predecessor] = residual
+                        heapq.heappush(queue, (-residual, predecessor))
+                else:
+                    priority[predecessor] = 0.0
+
+            if backups % model.n_states == 0:
+                self.training_deltas.append(float(-queue[0][0]) if queue else 0.0)
+
+        if backups % model.n_states:
+            self.training_deltas.append(float(priority.max()))
+        self.value_function[rows, cols] = values
+        self.n_backups += backups
+        return backups
+
+    def hierarchical_sweeping(self, max_sweeps=None):
+        """
+        Value iteration scheduled by a coarsened maze: the states are aggregated into the corridor
+        pieces of block_size x block_size blocks, and the coarse shortest-path problem from the goal
+        orders them into levels. A sweep backs up the levels from the goal outwards, every level
+        repeatedly (up to 2 * block_size times, until its own change is below theta) before moving
+        on, so values flow across the whole maze in one sweep instead of one cell per sweep.
+        An untouched value function starts at the value of staying put forever, a lower bound
+        that is exact at the goal, so the sweeps only have to raise it. Stops when a whole sweep
+        changes no value by more than theta, like sweep.
+        Appends the largest change of every sweep to training_deltas and returns the number of sweeps.
+        """
+        model = self.env.get_transition_model()
+        levels = self._hierarchy_levels()
+        rows, cols = self.env.state_coords.T
+        if self.n_backups == 0 and not self.value_function.any():
+            self.value_function[rows, cols] = model.R[:, 4] / (1 - self.discount_factor)
+        values = self.value_function[rows, cols]
+
+        sweeps = 0
+        while max_sweeps is None or sweeps < max_sweeps:
+            delta = 0.0
+            for states, P, R in levels:
+                for _ in range(2 * self.block_size):
+                    new_values = (R + self.discount_factor * (P @ values).reshape(R.shape)).max(axis=1)
+                    change = np.max(np.abs(new_values - values[states]))
+                    values[states] = new_values
+                    self.n_backups += len(states)
+                    delta = max(delta, change)
+                    if change < self.theta:
+                        break
+            sweeps += 1
+            self.training_deltas.append(float(delta))
+            if delta < self.theta:
+                break
+        self.value_function[rows, cols] = values
+        return sweeps
+
+    def replan(self, edit: MazeEdit):
+        """
+        Repairs a converged value function after env.apply_edits: the values of the states that are
+        still free are kept, new states start at the value of staying put, and prioritized sweeping
+        starts from the states whose transitions changed. Backups then only spread as far as the
+        values actually change, so the cost follows the size of the edit rather than of the maze.
+        Returns the number of backups made.
+        """
+        model = self.env.get_transition_model()
+        self._levels = None
+        # value_function is a grid, so the values stay with their cells
+        self.value_function[self.env.state_index < 0] = 0.0
+        rows, cols = self.env.state_coords[edit.added].T
+        self.value_function[rows, cols] = model.R[edit.added, 4] / (1 - self.discount_factor)
+        return self.prioritized_sweeping(states=edit.dirty)
+
+    def _hierarchy_levels(self):
+        """States, transition rows and rewards of every level of hierarchical_sweeping, goal level first."""
+        if self._levels is None:
+            model = self.env.get_transition_model()
+            distance = coarse_goal_distance(self.env, aggregate_blocks(self.env, self.block_size))
+            # states cut off from the goal come last
+            distance = np.where(distance < 0, distance.max() + 1, distance)
+            order = np.argsort(distance, kind="stable")
+            bounds = np.searchsorted(distance[order], np.arange(distance.max() + 2))
+            self._levels = []
+            for low, high in zip(bounds[:-1], bounds[1:]):
+                states = order[low:high]
+                transitions = (states[:, None] * model.n_actions + np.arange(model.n_actions)).ravel()
+                self._levels.append((states, model.P[transitions], model.R[states]))
+        return self._levels
 
     def compute_action_value_(self, state):
         """
@@ -99,22 +465,80 @@ class ValueIterationAgent(Agent):
     def get_action(self, state):
         action_values = self.compute_action_value_(state)
         return np.argmax(action_values)
-    
+
+    def greedy_policy(self) -> np.ndarray:
+        """Greedy action of every state with respect to the value function, indexed like env.state_space."""
+        model = self.env.get_transition_model()
+        return np.argmax(model.q_values(self.greedy_values(), self.discount_factor), axis=1).astype(self.policy_dtype)
+
+    def greedy_values(self) -> np.ndarray:
+        """Value of every state, indexed like env.state_space."""
+        rows, cols = self.env.state_coords.T
+        return self.value_function[rows, cols]
+
+    def state_dict(self) -> dict:
+        hyperparameters = dict(discount_factor=self.discount_factor, theta=self.theta, backend=self.backend,
+                               block_size=self.block_size)
+        return dict(hyperparameters=hyperparameters, n_backups=self.n_backups,
+                    value_function=self.value_function, policy=self.greedy_policy(),
+                    training_deltas=np.asarray(self.training_deltas, dtype=np.float64))
+
+    def load_state_dict(self, state: dict):
+        self.value_function = state["value_function"]
+        self.n_backups = state["n_backups"]
+        self.training_deltas = state["training_deltas"].tolist()
 
 
 class PolicyIterationAgent(Agent):
-    def __init__(self, env: MazeEnv, discount_factor: float = 0.95, theta: float = 1e-2):
+    EVALUATIONS = ("iterative", "direct", "gmres", "bicgstab", "modified")
+
+    def __init__(self, env: MazeEnv, discount_factor: float = 0.95, theta: float = 1e-2,
+                 evaluation: str = "direct", evaluation_sweeps: int = 20):
+        """
+        Args:
+            env: The maze environment
+            discount_factor: The discount factor
+            theta: Accuracy of the policy evaluation
+            evaluation: How the value of the current policy is computed:
+                "iterative" - in-place sweeps over the states until the change is below theta,
+                "direct" - sparse direct solve of (I - gamma * P_pi) V = R_pi,
+                "gmres" / "bicgstab" - ILU-preconditioned Krylov solve of the same system,
+                "modified" - evaluation_sweeps synchronous sweeps (modified policy iteration), once
+                    the policy is stable the sweeps go on until the values are accurate to theta
+            evaluation_sweeps: Number of sweeps per evaluation for the "modified" backend
+        """
         super().__init__(env, discount_factor)
+        if evaluation not in self.EVALUATIONS:
+            raise ValueError(f"Unknown policy evaluation backend: {evaluation}")
         self.env = env
         self.theta = theta
+        self.evaluation = evaluation
+        self.evaluation_sweeps = evaluation_sweeps
+        self.policy_changes = []
+        if self.compact:
+            # no per-state dicts on compact environments, the arrays are the policy
+            if evaluation == "iterative":
+                raise ValueError("The iterative policy evaluation needs the policy dicts, "
+                                 "which compact environments don't keep")
+            self.policy = self.state_values = None
+            self.policy_array = np.random.randint(self.env.action_space.n,
+                                                  size=len(env.state_coords)).astype(self.policy_dtype)
+            self.values = np.zeros(len(env.state_coords), dtype=self.value_dtype)
+            return
         self.policy = {}
         self.state_values = {}
         for state in env.state_space:
             self.policy[state] = np.random.choice(range(self.env.action_space.n))
             self.state_values[state] = 0.0
-        self.policy_changes = []
+        # Array copies of policy and state_values indexed like env.state_space,
+        # used by every backend but "iterative"
+        self.policy_array = np.array([self.policy[state] for state in env.state_space], dtype=np.int64)
+        self.values = np.zeros(len(env.state_space))
 
     def policy_evaluation(self):
+        if self.evaluation != "iterative":
+            self._evaluate_arrays()
+            return
         while True:
             delta = 0
             for state in self.env.state_space:
@@ -129,8 +553,46 @@ class PolicyIterationAgent(Agent):
             if delta < self.theta:
                 break
 
+    def _evaluate_arrays(self, converge=False):
+        model = self.env.get_transition_model()
+        states = np.arange(model.n_states)
+        P_pi = model.P[states * model.n_actions + self.policy_array]
+        R_pi = model.R[states, self.policy_array]
+
+        if self.evaluation == "modified":
+            sweeps = 0
+            while True:
+                values = R_pi + self.discount_factor * (P_pi @ self.values)
+                delta = np.abs(values - self.values).max(initial=0)
+                self.values = values
+                sweeps += 1
+                if sweeps < self.evaluation_sweeps:
+                    continue
+                # a change of theta * (1 - gamma) bounds the value error by theta, float32 (compact)
+                # values only settle up to a few ulps
+                theta = max(self.theta * (1 - self.discount_factor),
+                            4 * np.finfo(values.dtype).eps * np.abs(values).max(initial=1))
+                if not converge or delta < theta:
+                    return
+
+        A = (sparse.identity(model.n_states, format="csr") - self.discount_factor * P_pi).tocsc()
+        if self.evaluation == "direct":
+            self.values = linalg.spsolve(A, R_pi).astype(self.value_dtype, copy=False)
+            return
+
+        ilu = linalg.spilu(A)
+        preconditioner = linalg.LinearOperator(A.shape, ilu.solve)
+        solver = linalg.gmres if self.evaluation == "gmres" else linalg.bicgstab
+        # A residual of theta * (1 - gamma) bounds the value error by theta
+        values, info = solver(A, R_pi, x0=self.values, M=preconditioner,
+                              rtol=0, atol=self.theta * (1 - self.discount_factor))
+        if info != 0:
+            raise RuntimeError(f"{self.evaluation} policy evaluation did not converge (info={info})")
+        self.values = values.astype(self.value_dtype, copy=False)
 
     def policy_improvement(self):
+        if self.evaluation != "iterative":
+            return self._improve_arrays()
         policy_stable = True
         changes = 0
         for state in self.env.state_space:
@@ -149,19 +611,106 @@ class PolicyIterationAgent(Agent):
                 changes += 1
         return changes
 
-    def policy_iteration(self):
+    def policy_iteration(self, max_iterations=None):
+        """
+        Alternates evaluation and improvement until the policy is stable or max_iterations
+        iterations were made, and returns the number of iterations made
+        """
         iterations = 0
-        while True:
-            self.policy_evaluation()
+        stable = False
+        while max_iterations is None or iterations < max_iterations:
+            if self.evaluation == "modified":
+                # a fixed number of sweeps only approximates V^pi: once the policy is stable it is
+                # evaluated to theta, and the iteration stops if it is still greedy for these values
+                self._evaluate_arrays(converge=stable)
+            else:
+                self.policy_evaluation()
             changes = self.policy_improvement()
             self.policy_changes.append(changes)
             iterations += 1
-            if changes == 0:
+            if changes == 0 and (stable or self.evaluation != "modified"):
                 break
+            stable = changes == 0
+        if self.evaluation != "iterative":
+            self._sync_dicts()
         return iterations
 
+    def _improve_arrays(self):
+        model = self.env.get_transition_model()
+        states = np.arange(model.n_states)
+        action_values = model.q_values(self.values, self.discount_factor)
+        best_actions = np.argmax(action_values, axis=1)
+        # Keep the current action on ties so that the iteration can't cycle between equal actions.
+        # Ties are only exact up to rounding, a few ulps of the values on float32 (compact) models
+        current_values = action_values[states, self.policy_array]
+        tolerance = np.maximum(1e-9, 4 * np.finfo(action_values.dtype).eps * np.maximum(1, np.abs(current_values)))
+        best_actions = np.where(current_values >= action_values[states, best_actions] - tolerance,
+                                self.policy_array, best_actions)
+        changes = int(np.count_nonzero(best_actions != self.policy_array))
+        self.policy_array = best_actions.astype(self.policy_dtype, copy=False)
+        return changes
+
+    def _sync_dicts(self):
+        if self.policy is None:
+            return
+        for state, action, value in zip(self.env.state_space, self.policy_array.tolist(), self.values.tolist()):
+            self.policy[state] = action
+            self.state_values[state] = value
+
+    def greedy_policy(self) -> np.ndarray:
+        """Action of the current policy in every state, indexed like env.state_space."""
+        if self.evaluation == "iterative":
+            return np.array([self.policy[state] for state in self.env.state_space], dtype=np.int64)
+        return self.policy_array
+
+    def greedy_values(self) -> np.ndarray:
+        """Value of the current policy in every state, indexed like env.state_space."""
+        if self.evaluation == "iterative":
+            return np.array([self.state_values[state] for state in self.env.state_space])
+        return self.values
+
+    def state_dict(self) -> dict:
+        hyperparameters = dict(discount_factor=self.discount_factor, theta=self.theta,
+                               evaluation=self.evaluation, evaluation_sweeps=self.evaluation_sweeps)
+        return dict(hyperparameters=hyperparameters, policy=self.greedy_policy(), values=self.greedy_values(),
+                    policy_changes=np.asarray(self.policy_changes, dtype=np.int64))
+
+    def load_state_dict(self, state: dict):
+        self.policy_array = state["policy"]
+        self.values = state["values"]
+        self.policy_changes = state["policy_changes"].tolist()
+        self._sync_dicts()
+
+    def replan(self, edit: MazeEdit, max_iterations=None):
+        """
+        Warm-starts policy iteration after env.apply_edits: the states that are still free keep their
+        action and value, the states whose transitions changed get the greedy action of the carried
+        over values. Returns the number of policy iterations made.
+        """
+        if self.evaluation == "iterative":
+            # the dicts are ordered like the state space before the edit
+            policy = np.fromiter(self.policy.values(), dtype=np.int64, count=len(self.policy))
+            values = np.fromiter(self.state_values.values(), dtype=np.float64, count=len(self.state_values))
+        else:
+            policy, values = self.policy_array, self.values
+        model = self.env.get_transition_model()
+        self.values = edit.remap(values)
+        self.values[edit.added] = model.R[edit.added, 4] / (1 - self.discount_factor)
+        self.policy_array = edit.remap(policy)
+        self.policy_array[edit.dirty] = np.argmax(model.states_q_values(edit.dirty, self.values,
+                                                                        self.discount_factor), axis=1)
+        if self.policy is not None:
+            self.policy, self.state_values = {}, {}
+            self._sync_dicts()
+        return self.policy_iteration(max_iterations)
+
     def get_action(self, state: tuple[int, int, bool] | tuple[int, int]):
-        return self.policy.get(state, self.env.action_space.sample())
+        if self.policy is None:
+            index = self.env.state_index[state]
+            return int(self.policy_array[index]) if index >= 0 else self.env.action_space.sample()
+        action = self.policy.get(state)
+        # only states without a policy (walls) fall back to a random action
+        return action if action is not None else self.env.action_space.sample()
 
     def simulate_episode(self):
         states = []
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """Preallocated ring buffer of transitions stored as flat state indices.
+
+    Every field is its own array (states, actions, rewards, terminated, next_states), so a batch
+    is added or sampled with one fancy-indexing operation per field. Once `capacity` transitions
+    were added, each new one overwrites the oldest.
+
+    Args:
+        capacity: Number of transitions kept
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.terminated = np.zeros(capacity, dtype=bool)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.n_added = 0
+
+    def __len__(self):
+        return min(self.n_added, self.capacity)
+
+    def add(self, state: int, action: int, reward: float, terminated: bool, next_state: int):
+        i = self.n_added % self.capacity
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.terminated[i] = terminated
+        self.next_states[i] = next_state
+        self.n_added += 1
+
+    def add_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                  terminated: np.ndarray, next_states: np.ndarray):
+        # only the last `capacity` transitions of an oversized batch survive
+        start = max(0, len(states) - self.capacity)
+        index = (self.n_added + np.arange(start, len(states))) % self.capacity
+        self.states[index] = states[start:]
+        self.actions[index] = actions[start:]
+        self.rewards[index] = rewards[start:]
+        self.terminated[index] = terminated[start:]
+        self.next_states[index] = next_states[start:]
+        self.n_added += len(states)
+
+    def sample(self, batch_size: int) -> tuple[np.ndarray, ...]:
+        """Uniformly samples `batch_size` stored transitions, with replacement."""
+        index = np.random.randint(len(self), size=batch_size)
+        return (self.states[index], self.actions[index], self.rewards[index],
+                self.terminated[index], self.next_states[index])
+
+    def remap(self, edit):
+        """Renumbers the transitions after MazeEnv.apply_edits returned `edit`. Transitions touching removed
+        states or starting in a state whose dynamics changed (edit.dirty) are dropped."""
+        n = len(self)
+        order = (self.n_added - n + np.arange(n)) % self.capacity  # oldest first
+        states = edit.old_to_new[self.states[order]]
+        next_states = edit.old_to_new[self.next_states[order]]
+        keep = (states >= 0) & (next_states >= 0)
+        keep[keep] = ~np.isin(states[keep], edit.dirty)
+        fields = (states[keep], self.actions[order][keep], self.rewards[order][keep],
+                  self.terminated[order][keep], next_states[keep])
+        self.n_added = 0
+        self.add_batch(*fields)
+
+    def state_dict(self, prefix: str = "replay.") -> dict:
+        return {prefix + "states": self.states, prefix + "actions": self.actions, prefix + "rewards": self.rewards,
+                prefix + "terminated": self.terminated, prefix + "next_states": self.next_states,
+                prefix + "n_added": self.n_added}
+
+    def load_state_dict(self, state: dict, prefix: str = "replay."):
+        for field in ("states", "actions", "rewards", "terminated", "next_states"):
+            setattr(self, field, np.array(state[prefix + field]))
+        self.capacity = len(self.states)
+        self.n_added = int(state[prefix + "n_added"])
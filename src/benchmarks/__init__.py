@@ -0,0 +1,6 @@
+import os
+
+# keep the progress bars of the trainers out of the timings and the report
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+from .suite import CASES, Case, run_benchmarks, run_case, compare
@@ -0,0 +1,44 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+import scipy
+
+from benchmarks import CASES, run_benchmarks, compare
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks of the environment, planners and learners')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500, 2048], help="maze sides")
+    parser.add_argument('--cases', type=str, nargs='+', choices=[case.name for case in CASES],
+                        help="cases to run, all by default")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated mazes")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory runs")
+    parser.add_argument('--output', type=str, default="../results/benchmarks.json")
+    parser.add_argument('--baseline', type=str, help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="relative slowdown against the baseline reported as a regression")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.cases, args.seed, memory=not args.no_memory)
+    report = dict(
+        meta=dict(timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"), python=platform.python_version(),
+                  numpy=np.__version__, scipy=scipy.__version__, machine=platform.machine(),
+                  processor=platform.processor(), sizes=args.sizes, seed=args.seed),
+        results=results,
+    )
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for record in regressions:
+            print(f"REGRESSION {record['case']} size {record['size']}: "
+                  f"{record['baseline_seconds']:.4f} s -> {record['seconds']:.4f} s ({record['slowdown']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
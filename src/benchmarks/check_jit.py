@@ -0,0 +1,59 @@
+"""Fixed-seed check that the compiled and the interpreted Q-learning kernels learn like QLearningTrainer.
+
+    python -m benchmarks.check_jit
+"""
+import sys
+
+import numpy as np
+
+from agent import QLearningAgent
+from config import maze, start, goal
+from environment import MazeEnv
+from evaluation import evaluate_policy
+from trainer import QLearningTrainer
+from trainer.jit_episodes import numba_available
+
+
+def train(jit, compiled=None, n_episodes=1000, seed=0):
+    np.random.seed(seed)
+    env = MazeEnv(maze, start, goal, max_time=200)
+    env.action_space.seed(seed)
+    agent = QLearningAgent(env, 0.1, 1.0, 2.0 / n_episodes, 0.05)
+    trainer = QLearningTrainer(agent, n_episodes, jit=jit)
+    if compiled is not None:
+        import trainer.maze_trainer as maze_trainer
+        from trainer.jit_episodes import q_learning_episodes
+
+        kernel = maze_trainer.q_learning_episodes
+        maze_trainer.q_learning_episodes = lambda *args: q_learning_episodes(*args, compiled=compiled)
+        try:
+            trainer.train()
+        finally:
+            maze_trainer.q_learning_episodes = kernel
+    else:
+        trainer.train()
+    returns = agent.metrics["return"].series()
+    # last half of training, when epsilon is at its floor
+    return env, agent.greedy_policy(), float(np.mean(returns[len(returns) // 2:]))
+
+
+if __name__ == "__main__":
+    env, reference_policy, reference_return = train(jit=False)
+    reference_steps = evaluate_policy(env, reference_policy, 20_000, seed=0).mean_steps
+    paths = {"interpreted": False}
+    if numba_available():
+        paths["compiled"] = True
+    failed = False
+    for name, compiled in paths.items():
+        env, policy, mean_return = train(jit=True, compiled=compiled)
+        # rarely visited states keep near-arbitrary greedy actions, so the policies are
+        # compared by how fast they reach the goal and only reported state by state
+        agreement = float(np.mean(policy == reference_policy))
+        steps = evaluate_policy(env, policy, 20_000, seed=0).mean_steps
+        ok = (abs(steps - reference_steps) <= 0.1 * reference_steps
+              and abs(mean_return - reference_return) <= 0.1 * abs(reference_return))
+        failed |= not ok
+        print(f"{name:<12} greedy steps to goal {steps:.2f} (reference {reference_steps:.2f}), "
+              f"mean return {mean_return:.2f} (reference {reference_return:.2f}), "
+              f"same greedy action in {agreement:.0%} of states: {'ok' if ok else 'MISMATCH'}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,35 @@
+"""Fixed-seed check that policy iteration converges on compact (float32) environments like on full ones.
+
+    python -m benchmarks.check_policy_iteration
+"""
+import sys
+
+import numpy as np
+
+from agent import PolicyIterationAgent
+from environment import MazeEnv
+
+MAX_ITERATIONS = 300
+
+
+def solve(size, seed, compact, evaluation):
+    np.random.seed(seed)
+    env = MazeEnv.random(size, size, seed=seed, compact=compact)
+    agent = PolicyIterationAgent(env, 0.95, 1e-2, evaluation=evaluation)
+    iterations = agent.policy_iteration(MAX_ITERATIONS)
+    return agent, iterations
+
+
+if __name__ == "__main__":
+    failed = False
+    for size, seed in ((21, 0), (51, 0), (101, 1)):
+        reference, _ = solve(size, seed, compact=False, evaluation="direct")
+        for evaluation in ("direct", "gmres", "modified"):
+            agent, iterations = solve(size, seed, compact=True, evaluation=evaluation)
+            error = float(np.max(np.abs(agent.values - reference.values)))
+            ok = agent.policy_changes[-1] == 0 and error < 0.05
+            failed |= not ok
+            print(f"{size}x{size} seed {seed} {evaluation:<9} {iterations} iterations, "
+                  f"last changes {agent.policy_changes[-1]}, max value error {error:.2g}: "
+                  f"{'ok' if ok else 'FAILED'}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,204 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from agent import QLearningAgent, DynaQAgent, ValueIterationAgent, PolicyIterationAgent
+from environment import MazeEnv, VecMazeEnv
+from serving import PolicyServer
+from trainer import QLearningTrainer, ValueIterationTrainer
+
+
+class Case:
+    def __init__(self, name, func, max_size=None, unit=None):
+        """
+        Args:
+            name: Name of the benchmark
+            func: Callable taking a fresh MazeEnv and returning a dict with "seconds" and
+                optionally "count" (the number of `unit` done in that time) and other metrics
+            max_size: Largest maze side the case is run on, None for no limit
+            unit: What `count` counts, the rate is reported as `unit`/s
+        """
+        self.name = name
+        self.func = func
+        self.max_size = max_size
+        self.unit = unit
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def env_step(env, n_steps=20_000):
+    env.reset(seed=0)
+    actions = np.random.default_rng(0).integers(5, size=n_steps).tolist()
+    started = time.perf_counter()
+    for action in actions:
+        env.step(action)
+    return dict(seconds=time.perf_counter() - started, count=n_steps)
+
+
+def vec_env_step(env, n_envs=1024, n_steps=200):
+    vec_env = VecMazeEnv(env, n_envs)
+    vec_env.reset(seed=0)
+    actions = np.random.default_rng(0).integers(5, size=(n_steps, n_envs))
+    started = time.perf_counter()
+    for step_actions in actions:
+        vec_env.step(step_actions)
+    return dict(seconds=time.perf_counter() - started, count=n_steps * n_envs)
+
+
+def transition_function(env, n_calls=20_000):
+    states = env.state_space
+    calls = [(states[i % len(states)], i % 5) for i in range(n_calls)]
+    started = time.perf_counter()
+    for state, action in calls:
+        env.transition_function(state, action)
+    return dict(seconds=time.perf_counter() - started, count=n_calls)
+
+
+def transition_model(env):
+    seconds, model = _timed(env.get_transition_model)
+    return dict(seconds=seconds, count=model.n_states, nnz=int(model.P.nnz))
+
+
+def value_iteration(backend):
+    def run(env):
+        env.get_transition_model()
+        agent = ValueIterationAgent(env, backend=backend)
+        seconds, _ = _timed(ValueIterationTrainer(agent, 10_000).train)
+        return dict(seconds=seconds, count=agent.n_backups, iterations=len(agent.training_deltas))
+    return run
+
+
+def policy_iteration(evaluation):
+    def run(env):
+        env.get_transition_model()
+        np.random.seed(0)
+        agent = PolicyIterationAgent(env, evaluation=evaluation)
+        seconds, iterations = _timed(agent.policy_iteration)
+        return dict(seconds=seconds, iterations=iterations)
+    return run
+
+
+def q_learning(n_envs, n_episodes=200, jit=False):
+    def run(env):
+        np.random.seed(0)
+        agent = QLearningAgent(env, 0.01, 1.0, 2.0 / n_episodes, 0.1)
+        seconds, _ = _timed(QLearningTrainer(agent, n_episodes, n_envs=n_envs, jit=jit).train)
+        return dict(seconds=seconds, count=n_episodes * env.max_time)
+    return run
+
+
+def dyna_q(planning_steps, n_episodes=50):
+    def run(env):
+        np.random.seed(0)
+        agent = DynaQAgent(env, 0.01, 1.0, 2.0 / n_episodes, 0.1, planning_steps=planning_steps)
+        seconds, _ = _timed(QLearningTrainer(agent, n_episodes).train)
+        return dict(seconds=seconds, count=n_episodes * env.max_time * (1 + planning_steps))
+    return run
+
+
+def q_learning_update(env, n_updates=50_000):
+    agent = QLearningAgent(env, 0.01, 1.0, 0.0, 0.1)
+    rng = np.random.default_rng(0)
+    states = env.state_space
+    transitions = [(states[i], a, states[j]) for i, a, j in zip(rng.integers(len(states), size=n_updates).tolist(),
+                                                                 rng.integers(5, size=n_updates).tolist(),
+                                                                 rng.integers(len(states), size=n_updates).tolist())]
+    started = time.perf_counter()
+    for obs, action, next_obs in transitions:
+        agent.update(obs, action, -1, False, next_obs)
+    return dict(seconds=time.perf_counter() - started, count=n_updates)
+
+
+def serving_lookup(env, n_states=1_000_000, batch=4096):
+    server = PolicyServer(env.maze, np.zeros(len(env.state_coords), dtype=np.int8))
+    cells = np.random.default_rng(0).integers(env.n * env.m, size=n_states)
+    started = time.perf_counter()
+    for first in range(0, n_states, batch):
+        server.get_actions(cells[first:first + batch])
+    return dict(seconds=time.perf_counter() - started, count=n_states)
+
+
+CASES = [
+    Case("env.step", env_step, unit="steps"),
+    Case("vec_env.step", vec_env_step, unit="steps"),
+    Case("env.transition_function", transition_function, max_size=500, unit="calls"),
+    Case("env.transition_model", transition_model, unit="states"),
+    Case("value_iteration.loop", value_iteration("loop"), max_size=100, unit="backups"),
+    Case("value_iteration.vectorized", value_iteration("vectorized"), unit="backups"),
+    Case("value_iteration.prioritized", value_iteration("prioritized"), unit="backups"),
+    Case("value_iteration.hierarchical", value_iteration("hierarchical"), unit="backups"),
+    Case("policy_iteration.iterative", policy_iteration("iterative"), max_size=50),
+    Case("policy_iteration.direct", policy_iteration("direct"), max_size=500),
+    Case("policy_iteration.gmres", policy_iteration("gmres"), max_size=500),
+    Case("policy_iteration.bicgstab", policy_iteration("bicgstab"), max_size=500),
+    Case("policy_iteration.modified", policy_iteration("modified"), max_size=500),
+    Case("q_learning.update", q_learning_update, unit="updates"),
+    Case("q_learning.episodes", q_learning(n_envs=1), max_size=500, unit="steps"),
+    Case("q_learning.batched", q_learning(n_envs=100), unit="steps"),
+    Case("q_learning.jit", q_learning(n_envs=1, n_episodes=2000, jit=True), unit="steps"),
+    Case("q_learning.dyna", dyna_q(planning_steps=10), max_size=500, unit="updates"),
+    Case("serving.get_actions", serving_lookup, unit="lookups"),
+]
+
+
+def run_case(case, size, seed=0, memory=True):
+    """Runs one case on a generated size x size maze and returns its result record."""
+    def make_env():
+        return MazeEnv.random(size, size, seed=seed)
+
+    record = dict(case=case.name, size=size)
+    record.update(case.func(make_env()))
+    if case.unit is not None and "count" in record:
+        record["unit"] = case.unit
+        record["rate"] = record["count"] / record["seconds"]
+    if memory:
+        # separate run, tracemalloc slows the measured code down
+        env = make_env()
+        tracemalloc.start()
+        try:
+            case.func(env)
+            record["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+def run_benchmarks(sizes, cases=None, seed=0, memory=True, log=print):
+    """Runs every selected case on every maze size it supports and returns the result records."""
+    results = []
+    for case in CASES:
+        if cases and case.name not in cases:
+            continue
+        for size in sizes:
+            if case.max_size is not None and size > case.max_size:
+                continue
+            record = run_case(case, size, seed, memory)
+            results.append(record)
+            log(format_record(record))
+    return results
+
+
+def format_record(record):
+    line = f"{record['case']:<30} {record['size']:>5}  {record['seconds']:>10.4f} s"
+    if "rate" in record:
+        line += f"  {record['rate']:>14,.0f} {record['unit']}/s"
+    if "peak_mb" in record:
+        line += f"  {record['peak_mb']:>9.1f} MB"
+    return line
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Returns the records whose time grew by more than `tolerance` relative to the baseline records."""
+    reference = {(record["case"], record["size"]): record for record in baseline}
+    regressions = []
+    for record in results:
+        previous = reference.get((record["case"], record["size"]))
+        if previous is not None and record["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append(dict(record, baseline_seconds=previous["seconds"],
+                                    slowdown=record["seconds"] / previous["seconds"]))
+    return regressions
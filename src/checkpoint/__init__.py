@@ -0,0 +1 @@
+from .checkpoint import save_checkpoint, load_checkpoint, checkpoint_exists, save_agent, restore_agent, load_agent
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+
+def save_checkpoint(path: str, state: dict):
+    """Writes `state` to the directory `path`.
+
+    Every NumPy array becomes a raw .npy file that load_checkpoint can memory-map,
+    everything else must be JSON serializable and goes to meta.json. The checkpoint
+    is written to a temporary directory and swapped in, so a crash while saving
+    leaves the previous checkpoint intact.
+
+    Args:
+        path: The checkpoint directory
+        state: Flat mapping of names to arrays and JSON values
+    """
+    path = os.path.abspath(path)
+    tmp_path, old_path = path + ".tmp", path + ".old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    meta = {"arrays": []}
+    for key, value in state.items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(tmp_path, key + ".npy"), value)
+            meta["arrays"].append(key)
+        else:
+            meta[key] = value
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if os.path.exists(path):
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _resolve(path: str) -> str:
+    # a crash between the two renames of save_checkpoint leaves only the previous checkpoint
+    path = os.path.abspath(path)
+    if not os.path.exists(os.path.join(path, META_FILE)) and os.path.exists(os.path.join(path + ".old", META_FILE)):
+        return path + ".old"
+    return path
+
+
+def checkpoint_exists(path: str) -> bool:
+    return os.path.exists(os.path.join(_resolve(path), META_FILE))
+
+
+def load_checkpoint(path: str, mmap_mode: str | None = "r") -> dict:
+    """Reads a checkpoint written by save_checkpoint.
+
+    Args:
+        path: The checkpoint directory
+        mmap_mode: np.load memory-map mode of the arrays, "r" maps them read-only
+            without copying, None reads them into memory
+    """
+    path = _resolve(path)
+    with open(os.path.join(path, META_FILE)) as f:
+        state = json.load(f)
+    for key in state.pop("arrays"):
+        file = os.path.join(path, key + ".npy")
+        try:
+            state[key] = np.load(file, mmap_mode=mmap_mode)
+        except ValueError:
+            state[key] = np.load(file)  # empty arrays can't be memory-mapped
+    return state
+
+
+def save_agent(path: str, agent, **progress):
+    """Checkpoints `agent` together with its maze, see Agent.state_dict.
+
+    Args:
+        path: The checkpoint directory
+        agent: The agent to save
+        progress: Extra JSON values stored alongside, e.g. the number of finished episodes
+    """
+    env = agent.env.unwrapped
+    state = dict(agent=type(agent).__name__, maze=np.asarray(env.maze), start=[int(x) for x in env.start],
+                 goal=[int(x) for x in env.goal], max_time=int(env.max_time), compact=bool(env.compact))
+    state.update(agent.state_dict())
+    state.update(progress)
+    save_checkpoint(path, state)
+
+
+def restore_agent(path: str, agent) -> dict:
+    """Loads the checkpoint at `path` into memory and restores `agent` from it.
+
+    Returns the whole checkpoint, including the progress values given to save_agent.
+    Raises ValueError if the checkpoint belongs to another kind of agent or maze.
+    """
+    state = load_checkpoint(path, mmap_mode=None)
+    env = agent.env.unwrapped
+    if state["agent"] != type(agent).__name__:
+        raise ValueError(f"Checkpoint {path} holds a {state['agent']}, not a {type(agent).__name__}")
+    if (not np.array_equal(state["maze"], env.maze) or tuple(state["start"]) != tuple(env.start)
+            or tuple(state["goal"]) != tuple(env.goal)):
+        raise ValueError(f"Checkpoint {path} was trained on a different maze")
+    agent.load_state_dict(state)
+    return state
+
+
+def load_agent(path: str, mmap_mode: str | None = "r"):
+    """Rebuilds the environment and the agent saved at `path`.
+
+    With the default mmap_mode the tables stay memory-mapped read-only, which suits
+    acting and plotting; pass mmap_mode=None to continue training the agent.
+    The rebuilt agent keeps its metrics in memory only, it never touches the
+    metrics directory of the run that saved it.
+    """
+    from agent import QLearningAgent, DynaQAgent, ValueIterationAgent, PolicyIterationAgent
+    from environment import MazeEnv
+
+    agents = {cls.__name__: cls for cls in (QLearningAgent, DynaQAgent, ValueIterationAgent, PolicyIterationAgent)}
+    state = load_checkpoint(path, mmap_mode=mmap_mode)
+    env = MazeEnv(np.asarray(state["maze"]), tuple(state["start"]), tuple(state["goal"]), state["max_time"],
+                  compact=state.get("compact", False))
+    hyperparameters = dict(state["hyperparameters"])
+    # a loaded agent must not write into (or prune) the metrics directory of the run that saved it
+    hyperparameters.pop("metrics_path", None)
+    agent = agents[state["agent"]](env, **hyperparameters)
+    agent.load_state_dict(state)
+    return agent
@@ -14,11 +14,26 @@ maze = [
 start = (0, 0)
 goal = (9, 9)
 
+# Generated maze used instead of the one above when maze_size is set (see environment/maze_generator.py)
+maze_size = None
+maze_method = "kruskal"  # "kruskal", "binary_tree", "sidewinder" or "backtracker"
+seed = None
+compact = False  # uint8 walls, int32 states, float32 values and uint8 policies for very large mazes
+
 learning_rate = 0.01
 n_episodes = 10_000
 start_epsilon = 1.0
 epsilon_decay = start_epsilon / (n_episodes / 2)
 final_epsilon = 0.1
 max_time = 200
+n_envs = 1  # episodes played in lockstep by the Q-learning trainer
+n_workers = 1  # worker processes of the Q-learning trainer
+parallel_mode = "hogwild"  # "hogwild" or "average"
+jit = False  # play Q-learning episodes in a compiled kernel (numba if installed, see trainer/jit_episodes.py)
+planning_steps = 0  # Dyna-Q simulated updates per real step, 0 for plain Q-learning
+replay_capacity = 100_000  # transitions the Dyna-Q planning draws its (state, action) pairs from
 discount_factor = 0.95
+value_iteration_backend = "vectorized"  # "loop", "vectorized", "prioritized" or "hierarchical"
+policy_evaluation = "direct"  # "iterative", "direct", "gmres", "bicgstab" or "modified"
+checkpoint_every = 1000  # episodes (sweeps, policy iterations) between checkpoints
 plot_path = "../img/"
\ No newline at end of file
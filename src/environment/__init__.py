@@ -1 +1,6 @@
-from .environment import MazeEnv
\ No newline at end of file
+from .environment import MazeEnv
+from .maze_generator import generate_maze, generate_mazes
+from .transition_model import TransitionModel
+from .maze_edit import MazeEdit
+from .coarsening import aggregate_blocks, coarse_goal_distance
+from .vec_environment import VecMazeEnv
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+
+def aggregate_blocks(env, block_size: int) -> np.ndarray:
+    """Groups the states of `env` into coarse states: the connected pieces of corridor inside
+    every block_size x block_size block of the maze.
+
+    Splitting blocks along walls keeps the states of a group a few steps apart, where a
+    plain block could join corridors that are far apart in the maze. Returns the group of
+    every state, indexed like env.state_space.
+    """
+    model = env.get_transition_model()
+    rows, cols = env.state_coords.T
+    blocks = (rows // block_size) * -(-env.m // block_size) + cols // block_size
+    source, target = _edges(model)
+    inside = blocks[source] == blocks[target]
+    graph = sparse.csr_matrix((np.ones(np.count_nonzero(inside)), (source[inside], target[inside])),
+                              shape=(model.n_states, model.n_states))
+    return csgraph.connected_components(graph, directed=False)[1]
+
+
+def coarse_goal_distance(env, groups: np.ndarray) -> np.ndarray:
+    """Number of coarse states between the group of every state and the group of the goal,
+    measured on the graph of adjacent groups. Returns -1 for states that can't reach the goal."""
+    model = env.get_transition_model()
+    source, target = _edges(model)
+    n_groups = groups.max() + 1
+    graph = sparse.csr_matrix((np.ones(len(source)), (groups[source], groups[target])), shape=(n_groups, n_groups))
+    distance = csgraph.shortest_path(graph, unweighted=True, indices=groups[model.goal_index])
+    return np.where(np.isinf(distance), -1, distance).astype(np.int64)[groups]
+
+
+def _edges(model):
+    # every pair of neighbouring free cells, once in each direction
+    source = np.repeat(np.arange(model.n_states), 4)
+    target = model.neighbors.ravel()
+    free = target >= 0
+    return source[free], target[free]
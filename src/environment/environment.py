@@ -1,13 +1,21 @@
 import gymnasium as gym
-import matplotlib.pyplot as plt
 import numpy as np
 from gymnasium import spaces
 
+from .maze_edit import MazeEdit
+from .maze_generator import generate_maze
+from .transition_model import TransitionModel
+
 
 class MazeEnv(gym.Env):
-    def __init__(self, maze, start, goal, max_time=200):
+    def __init__(self, maze, start, goal, max_time=200, compact=False):
+        '''
+        compact=True keeps large mazes small: walls as a uint8 grid, state indices and coordinates
+        as int32 and a float32 transition model; agents then also use float32 values and uint8 policies
+        '''
         super(MazeEnv, self).__init__()
-        self.maze = np.array(maze)
+        self.compact = compact
+        self.maze = np.array(maze, dtype=np.uint8 if compact else None)
         self.start = start
         self.goal = goal
         self.state = start
@@ -15,13 +23,31 @@ class MazeEnv(gym.Env):
 
         self.action_space = spaces.Discrete(5)  # 0: Up, 1: Down, 2: Left, 3: Right, 4: Stay
         self.observation_space = spaces.Tuple((spaces.Discrete(self.n), spaces.Discrete(self.m)))
-        self.state_space = self._generate_state_space()
+        self.state_index, self.state_coords = self._generate_state_index()
+        self._state_space = None
+        self._transition_model = None
 
         self.discount = 0.99
         self.transitions = [(-1, 0), (1, 0), (0, -1), (0, 1), (0, 0)]
         self.time = 0
         self.max_time = max_time
 
+    @classmethod
+    def random(cls, n, m, method="kruskal", seed=None, max_time=200, compact=False):
+        '''
+        Creates an environment on a generated n x m maze with the start and goal in opposite corners
+        '''
+        return cls(generate_maze(n, m, method, seed), (0, 0), (n - 1, m - 1), max_time, compact)
+
+    @property
+    def state_space(self):
+        '''
+        List of the (i, j) free cells in row-major order, built on first use
+        '''
+        if self._state_space is None:
+            self._state_space = self._generate_state_space()
+        return self._state_space
+
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.state = self.start
@@ -88,12 +114,60 @@ class MazeEnv(gym.Env):
             return transitions
     
     def _generate_state_space(self):
-        states = []
-        for i in range(self.n):
-            for j in range(self.m):
-                if self.maze[i, j] == 0:
-                    states.append((i,j))
-        return states
+        return list(map(tuple, self.state_coords.tolist()))
+
+    def _generate_state_index(self):
+        '''
+        Returns an (n, m) grid of state indices (-1 for walls) and the (|S|, 2) coordinates of every state
+        '''
+        index_dtype = np.int32 if self.compact else np.int64
+        free = self.maze == 0
+        state_index = np.full(self.maze.shape, -1, dtype=index_dtype)
+        state_index[free] = np.arange(np.count_nonzero(free), dtype=index_dtype)
+        return state_index, np.argwhere(free).astype(index_dtype, copy=False)
+
+    def state_to_index(self, state):
+        return int(self.state_index[state])
+
+    def get_transition_model(self):
+        '''
+        Returns the precompiled TransitionModel of the maze, building it on first use
+        '''
+        if self._transition_model is None:
+            self._transition_model = TransitionModel.from_env(self, np.float32 if self.compact else np.float64)
+        return self._transition_model
+
+    def apply_edits(self, cells, values) -> MazeEdit:
+        '''
+        Sets maze[cells] = values (0 - free, 1 - wall) and renumbers the states. A transition model
+        that was already built is patched: only the rows of the states next to the edited cells are
+        rebuilt. Returns the MazeEdit that agents use to carry their tables over (see replan).
+        '''
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        values = np.broadcast_to(np.asarray(values), len(cells))
+        rows, cols = cells.T
+        if not ((rows >= 0) & (rows < self.n) & (cols >= 0) & (cols < self.m)).all():
+            raise ValueError("Edited cells must lie inside the maze")
+        walls = {tuple(cell) for cell in cells[values == 1].tolist()}
+        if tuple(self.start) in walls or tuple(self.goal) in walls:
+            raise ValueError("The start and the goal can't become walls")
+
+        was_free = self.state_index >= 0
+        self.maze[rows, cols] = values
+        self.state_index, self.state_coords = self._generate_state_index()
+        self._state_space = None
+        # old states are numbered in row-major order, like the cells of the mask
+        old_to_new = self.state_index[was_free]
+
+        around = cells[:, None, :] + np.array([(0, 0)] + self.transitions[:4])[None, :, :]
+        around = around.reshape(-1, 2)
+        inside = (around[:, 0] >= 0) & (around[:, 0] < self.n) & (around[:, 1] >= 0) & (around[:, 1] < self.m)
+        dirty = np.unique(self.state_index[around[inside, 0], around[inside, 1]])
+        edit = MazeEdit(old_to_new, dirty[dirty >= 0], len(self.state_coords))
+
+        if self._transition_model is not None:
+            self._transition_model = self._transition_model.apply_edit(self, edit)
+        return edit
 
     def _is_valid(self, state):
         x, y = state
@@ -108,7 +182,9 @@ class MazeEnv(gym.Env):
         return neighbors
 
     def render(self):
-        display_maze = self.maze.copy()
+        import matplotlib.pyplot as plt
+
+        display_maze = self.maze.copy().astype(float)
         display_maze[self.maze == 1] = -100
         display_maze[self.state] = 100
         display_maze[self.goal] = 200
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+class MazeEdit:
+    """How the states of a MazeEnv were renumbered by MazeEnv.apply_edits.
+
+    Args:
+        old_to_new: New index of every state before the edit, -1 for states that became walls
+        dirty: New indices of the states whose transitions changed: the edited cells that are
+            free and their free neighbours
+        n_states: Number of states after the edit
+    """
+
+    def __init__(self, old_to_new: np.ndarray, dirty: np.ndarray, n_states: int):
+        self.old_to_new = old_to_new
+        self.dirty = dirty
+        self.n_states = n_states
+        kept = old_to_new >= 0
+        # Old index of every new state, -1 for cells that became free
+        self.new_to_old = np.full(n_states, -1, dtype=np.int64)
+        self.new_to_old[old_to_new[kept]] = np.flatnonzero(kept)
+
+    @property
+    def added(self) -> np.ndarray:
+        """New indices of the cells that became free."""
+        return np.flatnonzero(self.new_to_old < 0)
+
+    def remap(self, array: np.ndarray, fill=0) -> np.ndarray:
+        """Carries a per-state array (old states along the first axis) over to the new states, added states get `fill`."""
+        remapped = np.full((self.n_states,) + array.shape[1:], fill, dtype=array.dtype)
+        kept = self.new_to_old >= 0
+        remapped[kept] = array[self.new_to_old[kept]]
+        return remapped
@@ -0,0 +1,134 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+METHODS = ("kruskal", "binary_tree", "sidewinder", "backtracker")
+
+
+def generate_maze(n: int, m: int, method: str = "kruskal", seed=None) -> np.ndarray:
+    """Generates a random n x m maze (0 - free, 1 - wall) as a uint8 grid.
+
+    Cells sit on even coordinates and the walls between neighbouring cells are carved
+    out along a spanning tree, so every free cell, including the start (0, 0) and the
+    goal (n - 1, m - 1), is reachable from every other. An even dimension gets an open
+    last row or column.
+
+    Args:
+        n: Number of rows
+        m: Number of columns
+        method: "kruskal" - uniform random spanning tree edges (random-weight minimum
+            spanning tree, computed by scipy), "binary_tree" and "sidewinder" - fully
+            vectorized, biased towards the top-left, "backtracker" - iterative depth-first
+            search with long corridors, the only one with a Python loop per cell
+        seed: Seed or np.random.Generator
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown maze generation method: {method}")
+    if n < 1 or m < 1:
+        raise ValueError(f"Maze must have at least one cell, got {n}x{m}")
+    rng = np.random.default_rng(seed)
+    h, w = (n + 1) // 2, (m + 1) // 2
+
+    # Which of the passages between horizontally / vertically adjacent cells are open
+    east, south = _CARVERS[method](h, w, rng)
+
+    maze = np.ones((n, m), dtype=np.uint8)
+    maze[0:2 * h - 1:2, 0:2 * w - 1:2] = 0
+    maze[0:2 * h - 1:2, 1:2 * w - 2:2][east] = 0
+    maze[1:2 * h - 2:2, 0:2 * w - 1:2][south] = 0
+    if n % 2 == 0:
+        maze[-1] = 0
+    if m % 2 == 0:
+        maze[:, -1] = 0
+    return maze
+
+
+def generate_mazes(count: int, n: int, m: int, method: str = "kruskal", seed=None) -> np.ndarray:
+    """Generates `count` independent mazes as a (count, n, m) uint8 array.
+
+    Every maze gets its own child of np.random.SeedSequence(seed), so the batch is
+    reproducible and maze i does not depend on `count`.
+    """
+    children = np.random.SeedSequence(seed).spawn(count)
+    mazes = np.empty((count, n, m), dtype=np.uint8)
+    for i, child in enumerate(children):
+        mazes[i] = generate_maze(n, m, method, np.random.default_rng(child))
+    return mazes
+
+
+def _kruskal(h, w, rng):
+    cells = np.arange(h * w).reshape(h, w)
+    rows = np.concatenate([cells[:, :-1].ravel(), cells[:-1, :].ravel()])
+    cols = np.concatenate([cells[:, 1:].ravel(), cells[1:, :].ravel()])
+    # weights must be positive: csgraph treats zero entries as missing edges
+    weights = rng.random(len(rows)) + 1
+    graph = sparse.csr_matrix((weights, (rows, cols)), shape=(h * w, h * w))
+    tree = csgraph.minimum_spanning_tree(graph).tocoo()
+    low, high = np.minimum(tree.row, tree.col), np.maximum(tree.row, tree.col)
+
+    east = np.zeros((h, w - 1), dtype=bool)
+    south = np.zeros((h - 1, w), dtype=bool)
+    horizontal = low // w == high // w
+    east[low[horizontal] // w, low[horizontal] % w] = True
+    south[low[~horizontal] // w, low[~horizontal] % w] = True
+    return east, south
+
+
+def _binary_tree(h, w, rng):
+    # every cell but the top-left one opens towards north or west
+    go_north = rng.random((h, w)) < 0.5
+    go_north[0, :] = False
+    go_north[:, 0] = True
+    go_north[0, 0] = False
+    go_west = ~go_north
+    go_west[0, 0] = False
+    return go_west[:, 1:], go_north[1:, :]
+
+
+def _sidewinder(h, w, rng):
+    # runs of cells joined eastwards, every run below the first row opens north from a random cell
+    close = rng.random((h, w)) < 0.5
+    close[:, -1] = True
+    close[0, :] = False
+    close[0, -1] = True
+    east = ~close[:, :-1]
+
+    run_ends = np.flatnonzero(close.ravel())
+    run_starts = np.concatenate([[0], run_ends[:-1] + 1])
+    chosen = run_starts + (rng.random(len(run_starts)) * (run_ends - run_starts + 1)).astype(np.int64)
+    chosen = chosen[chosen >= w]
+    south = np.zeros((h - 1, w), dtype=bool)
+    south[chosen // w - 1, chosen % w] = True
+    return east, south
+
+
+def _backtracker(h, w, rng):
+    east = np.zeros((h, w - 1), dtype=bool)
+    south = np.zeros((h - 1, w), dtype=bool)
+    visited = np.zeros((h, w), dtype=bool)
+    visited[0, 0] = True
+    stack = [(0, 0)]
+    moves = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    while stack:
+        i, j = stack[-1]
+        options = [(i + di, j + dj) for di, dj in moves
+                   if 0 <= i + di < h and 0 <= j + dj < w and not visited[i + di, j + dj]]
+        if not options:
+            stack.pop()
+            continue
+        ni, nj = options[rng.integers(len(options))]
+        if ni == i:
+            east[i, min(j, nj)] = True
+        else:
+            south[min(i, ni), j] = True
+        visited[ni, nj] = True
+        stack.append((ni, nj))
+    return east, south
+
+
+_CARVERS = {
+    "kruskal": _kruskal,
+    "binary_tree": _binary_tree,
+    "sidewinder": _sidewinder,
+    "backtracker": _backtracker,
+}
@@ -0,0 +1,155 @@
+import numpy as np
+from scipy import sparse
+
+
+class TransitionModel:
+    """Compact array representation of the whole MazeEnv MDP.
+
+    States are indexed in `MazeEnv.state_space` order. `P` is a CSR matrix of
+    shape (n_states * n_actions, n_states) whose row `s * n_actions + a` holds
+    P(s' | s, a), and `R[s, a]` is the expected immediate reward.
+    """
+
+    def __init__(self, P: sparse.csr_matrix, R: np.ndarray, neighbors: np.ndarray, goal_index: int):
+        self.P = P
+        self.R = R
+        # neighbors[s, d] is the index of the free cell in direction d (Up, Down, Left, Right) or -1
+        self.neighbors = neighbors
+        self.goal_index = goal_index
+        self.n_states, self.n_actions = R.shape
+
+        # The free neighbours of every state packed to the left and padded with the state itself,
+        # so that free_neighbors[s, k] for k < max(n_free[s], 1) is a uniform slip target
+        free = neighbors >= 0
+        self.n_free = free.sum(axis=1)
+        order = np.argsort(~free, axis=1, kind="stable")
+        packed = np.take_along_axis(neighbors, order, axis=1)
+        self.free_neighbors = np.where(np.arange(4) < self.n_free[:, None], packed,
+                                       np.arange(self.n_states, dtype=neighbors.dtype)[:, None])
+        self._predecessors = None
+
+    @classmethod
+    def from_env(cls, env, dtype=np.float64, chunk_size: int = 1 << 18):
+        """Builds the model for every state of `env`, vectorized over chunks of chunk_size states
+        so that the temporaries stay small on large mazes."""
+        n_states = len(env.state_coords)
+        parts = [cls._build_rows(env, np.arange(first, min(first + chunk_size, n_states)), dtype)
+                 for first in range(0, n_states, chunk_size)]
+        if len(parts) == 1:
+            neighbors, P, R = parts[0]
+        else:
+            neighbors = np.concatenate([part[0] for part in parts])
+            R = np.concatenate([part[2] for part in parts])
+            P = sparse.vstack([part[1] for part in parts], format="csr")
+            del parts
+        return cls(P, R, neighbors, int(env.state_index[env.goal]))
+
+    def apply_edit(self, env, edit) -> "TransitionModel":
+        """Returns the model of `env` after MazeEnv.apply_edits: the rows of edit.dirty are rebuilt,
+        the rows of every other state are copied over with their next states renumbered."""
+        n_actions = self.n_actions
+        dirty = np.zeros(edit.n_states, dtype=bool)
+        dirty[edit.dirty] = True
+        kept = np.flatnonzero(~dirty)
+        kept_rows = (edit.new_to_old[kept][:, None] * n_actions + np.arange(n_actions)).ravel()
+        P_kept = self.P[kept_rows]
+        P_kept = sparse.csr_matrix((P_kept.data, edit.old_to_new[P_kept.indices], P_kept.indptr),
+                                   shape=(len(kept_rows), edit.n_states))
+        dirty_neighbors, P_dirty, R_dirty = self._build_rows(env, edit.dirty, self.R.dtype)
+
+        # rows of the kept states first, then the dirty ones, put back into state order
+        order = np.argsort(np.concatenate([kept, edit.dirty]), kind="stable")
+        rows = (order[:, None] * n_actions + np.arange(n_actions)).ravel()
+        P = sparse.vstack([P_kept, P_dirty], format="csr")[rows]
+        R = np.concatenate([self.R[edit.new_to_old[kept]], R_dirty])[order]
+        kept_neighbors = self.neighbors[edit.new_to_old[kept]]
+        kept_neighbors = np.where(kept_neighbors >= 0, edit.old_to_new[kept_neighbors], -1)
+        neighbors = np.concatenate([kept_neighbors, dirty_neighbors])[order]
+        return TransitionModel(P, R, neighbors, int(env.state_index[env.goal]))
+
+    @staticmethod
+    def _build_rows(env, states, dtype):
+        """Neighbours, transition rows (row `i * n_actions + a` for states[i]) and rewards of `states`."""
+        coords = env.state_coords[states]
+        n_states = len(env.state_coords)
+        n_rows = len(states)
+        n_actions = env.action_space.n
+        self_index = np.asarray(states, dtype=env.state_index.dtype)
+        goal_index = env.state_index[env.goal]
+
+        moves = np.array(env.transitions[:4])
+        neighbor_coords = coords[:, None, :] + moves[None, :, :]
+        inside = ((neighbor_coords[..., 0] >= 0) & (neighbor_coords[..., 0] < env.n)
+                  & (neighbor_coords[..., 1] >= 0) & (neighbor_coords[..., 1] < env.m))
+        neighbor_coords[~inside] = 0
+        neighbors = np.where(inside, env.state_index[neighbor_coords[..., 0], neighbor_coords[..., 1]], -1)
+        free = neighbors >= 0
+        n_free = free.sum(axis=1)
+        share = np.divide(1.0, n_free, out=np.zeros(n_rows), where=n_free > 0)
+
+        # Candidate next states of every (s, a): the four neighbours and s itself
+        targets = np.concatenate([neighbors, self_index[:, None]], axis=1)
+        probs = np.zeros((n_rows, n_actions, 5))
+        # Reward is decided by the next state, except for blocked moves, where it is decided by s
+        next_rewards = np.where(targets == goal_index, 0.0, -1.0)
+        state_rewards = np.where(self_index == goal_index, 0.0, -1.0)
+        rewards = np.broadcast_to(next_rewards[:, None, :], probs.shape).copy()
+
+        for action in range(4):
+            intended = free[:, action]
+            blocked = ~intended & (n_free > 0)
+            stuck = ~intended & (n_free == 0)
+
+            probs[intended, action, :4] = free[intended] * (0.15 * share[intended])[:, None]
+            probs[intended, action, action] += 0.85
+            probs[blocked, action, :4] = free[blocked] * share[blocked][:, None]
+            rewards[blocked, action, :] = state_rewards[blocked][:, None]
+            probs[stuck, action, 4] = 1.0
+        probs[:, 4, 4] = 1.0
+
+        R = (probs * rewards).sum(axis=2).astype(dtype)
+        mask = probs > 0
+        indptr = np.zeros(n_rows * n_actions + 1, dtype=np.int64)
+        np.cumsum(mask.sum(axis=2).ravel(), out=indptr[1:])
+        indices = np.broadcast_to(targets[:, None, :], probs.shape)[mask]
+        P = sparse.csr_matrix((probs[mask].astype(dtype), indices, indptr),
+                              shape=(n_rows * n_actions, n_states))
+        return neighbors, P, R
+
+    def sample_next_states(self, states: np.ndarray, actions: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Draws the next states of a batch of (state, action) pairs under the slippery dynamics of MazeEnv.step."""
+        # Same draws as MazeEnv.step: a slip check and a uniform choice among the free neighbours
+        slip = rng.random(len(states)) > 0.85
+        choice = (rng.random(len(states)) * np.maximum(self.n_free[states], 1)).astype(np.int64)
+        random_neighbor = self.free_neighbors[states, choice]
+
+        moving = actions != 4
+        intended = np.where(moving, self.neighbors[states, np.minimum(actions, 3)], states)
+        blocked = moving & (intended < 0)
+        slipped = moving & ~blocked & slip
+        return np.where(blocked | slipped, random_neighbor, intended)
+
+    def q_values(self, values: np.ndarray, discount_factor: float) -> np.ndarray:
+        """Returns the (n_states, n_actions) action values for state values `values`."""
+        return self.R + discount_factor * (self.P @ values).reshape(self.n_states, self.n_actions)
+
+    def states_q_values(self, states: np.ndarray, values: np.ndarray, discount_factor: float) -> np.ndarray:
+        """Returns the (len(states), n_actions) action values of a subset of the states."""
+        rows = (states[:, None] * self.n_actions + np.arange(self.n_actions)).ravel()
+        return self.R[states] + discount_factor * (self.P[rows] @ values).reshape(len(states), self.n_actions)
+
+    def state_q_values(self, state: int, values: np.ndarray, discount_factor: float) -> np.ndarray:
+        """Returns the action values of a single state, reading only its own rows of P."""
+        row_starts = self.P.indptr[state * self.n_actions:(state + 1) * self.n_actions + 1]
+        low, high = row_starts[0], row_starts[-1]
+        expected = self.P.data[low:high] * values[self.P.indices[low:high]]
+        return self.R[state] + discount_factor * np.add.reduceat(expected, row_starts[:-1] - low)
+
+    def predecessors(self) -> sparse.csr_matrix:
+        """Returns an (n_states, n_states) CSR matrix whose row s' lists every s with P(s' | s, a) > 0 for some a."""
+        if self._predecessors is None:
+            coo = self.P.tocoo()
+            self._predecessors = sparse.csr_matrix(
+                (np.ones(coo.nnz, dtype=np.int8), (coo.col, coo.row // self.n_actions)),
+                shape=(self.n_states, self.n_states))
+        return self._predecessors
@@ -0,0 +1,66 @@
+import numpy as np
+from gymnasium import spaces
+from gymnasium.utils import seeding
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from .environment import MazeEnv
+
+
+class VecMazeEnv(VectorEnv):
+    """Steps `num_envs` independent copies of a MazeEnv at once.
+
+    Agent positions are kept as flat state indices (see `MazeEnv.state_index`) and the
+    slippery dynamics are applied to all sub-environments in one call using the neighbour
+    table of the precompiled transition model. Like gymnasium's SyncVectorEnv, a
+    sub-environment whose episode ended is reset on the following `step` call.
+    """
+
+    def __init__(self, env: MazeEnv, num_envs: int):
+        self.env = env
+        self.num_envs = num_envs
+        self.model = env.get_transition_model()
+        self.start_index = env.state_to_index(env.start)
+        self.max_time = env.max_time
+
+        self.single_observation_space = spaces.Discrete(self.model.n_states)
+        self.single_action_space = env.action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        self.states = np.full(num_envs, self.start_index, dtype=np.int64)
+        self.time = np.zeros(num_envs, dtype=np.int64)
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+
+    @property
+    def positions(self):
+        """(num_envs, 2) maze coordinates of the agents"""
+        return self.env.state_coords[self.states]
+
+    def reset(self, *, seed=None, options=None):
+        if seed is not None:
+            self._np_random, self._np_random_seed = seeding.np_random(seed)
+        self.states[:] = self.start_index
+        self.time[:] = 0
+        self._autoreset[:] = False
+        return self.states.copy(), {}
+
+    def step(self, actions):
+        next_states = self.model.sample_next_states(self.states, np.asarray(actions), self.np_random)
+
+        rewards = np.where(next_states == self.model.goal_index, 0, -1)
+        self.time += 1
+        # MazeEnv reports the time limit through `terminated`, so do the same here
+        terminated = self.time >= self.max_time
+        truncated = np.zeros(self.num_envs, dtype=bool)
+
+        # Sub-environments that finished on the previous step start a new episode instead
+        reset = self._autoreset
+        next_states[reset] = self.start_index
+        self.time[reset] = 0
+        rewards[reset] = 0
+        terminated[reset] = False
+
+        self.states = next_states
+        self._autoreset = terminated | truncated
+        return self.states.copy(), rewards, terminated, truncated, {}
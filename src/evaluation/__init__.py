@@ -0,0 +1 @@
+from .monte_carlo import EvaluationResult, evaluate_policy, evaluate_agent, wilson_interval
@@ -0,0 +1,24 @@
+import argparse
+import json
+
+from evaluation import evaluate_agent
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Monte Carlo evaluation of a checkpointed policy')
+    parser.add_argument('--checkpoint', type=str, default="../results/q-learning/checkpoint",
+                        help="checkpoint directory written by main.py")
+    parser.add_argument('--rollouts', type=int, default=100_000)
+    parser.add_argument('--max-steps', type=int, default=None, help="step limit, max_time of the maze by default")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--output', type=str, default=None, help="JSON file for the summary")
+    args = parser.parse_args()
+
+    from checkpoint import load_agent
+
+    result = evaluate_agent(load_agent(args.checkpoint), args.rollouts, max_steps=args.max_steps,
+                            seed=args.seed, confidence=args.confidence)
+    print(result)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(result.summary(), f, indent=2)
@@ -0,0 +1,114 @@
+import numpy as np
+from scipy import stats
+
+
+class EvaluationResult:
+    """Outcome of Monte Carlo rollouts of a fixed policy.
+
+    Args:
+        steps: Steps to reach the goal of every rollout, -1 for rollouts that did not reach it
+        max_steps: Step limit of the rollouts
+        confidence: Level of the reported confidence intervals
+    """
+
+    def __init__(self, steps: np.ndarray, max_steps: int, confidence: float = 0.95):
+        self.steps = steps
+        self.max_steps = max_steps
+        self.confidence = confidence
+        self.n_rollouts = len(steps)
+        self.successes = int(np.count_nonzero(steps >= 0))
+        self.success_rate = self.successes / self.n_rollouts
+        self.success_interval = wilson_interval(self.successes, self.n_rollouts, confidence)
+
+        z = stats.norm.ppf(0.5 + confidence / 2)
+        reached = steps[steps >= 0]
+        if len(reached):
+            self.mean_steps = float(reached.mean())
+            half_width = z * reached.std(ddof=1) / np.sqrt(len(reached)) if len(reached) > 1 else np.nan
+            self.mean_steps_interval = (self.mean_steps - half_width, self.mean_steps + half_width)
+            self.step_percentiles = dict(zip((5, 25, 50, 75, 95), np.percentile(reached, (5, 25, 50, 75, 95)).tolist()))
+        else:
+            self.mean_steps = np.nan
+            self.mean_steps_interval = (np.nan, np.nan)
+            self.step_percentiles = {}
+
+    def histogram(self) -> np.ndarray:
+        """Number of rollouts that reached the goal after exactly k steps, for k = 0 .. max_steps."""
+        return np.bincount(self.steps[self.steps >= 0], minlength=self.max_steps + 1)
+
+    def summary(self) -> dict:
+        return dict(n_rollouts=self.n_rollouts, max_steps=self.max_steps, confidence=self.confidence,
+                    success_rate=self.success_rate, success_interval=list(self.success_interval),
+                    mean_steps=self.mean_steps, mean_steps_interval=list(self.mean_steps_interval),
+                    step_percentiles=self.step_percentiles)
+
+    def __str__(self):
+        level = f"{self.confidence:.0%}"
+        lines = [f"Rollouts:      {self.n_rollouts:,} (at most {self.max_steps} steps)",
+                 f"Success rate:  {self.success_rate:.4f}  {level} CI [{self.success_interval[0]:.4f}, "
+                 f"{self.success_interval[1]:.4f}]",
+                 f"Steps to goal: mean {self.mean_steps:.2f}  {level} CI [{self.mean_steps_interval[0]:.2f}, "
+                 f"{self.mean_steps_interval[1]:.2f}]"]
+        if self.step_percentiles:
+            lines.append("               " + "  ".join(f"p{p} {v:g}" for p, v in self.step_percentiles.items()))
+        return "\n".join(lines)
+
+
+def wilson_interval(successes: int, n: int, confidence: float = 0.95) -> tuple[float, float]:
+    """Wilson score interval of a binomial proportion, well behaved for rates close to 0 or 1."""
+    if n == 0:
+        return (0.0, 1.0)
+    z = stats.norm.ppf(0.5 + confidence / 2)
+    p = successes / n
+    center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    half_width = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    low = 0.0 if successes == 0 else max(0.0, center - half_width)
+    high = 1.0 if successes == n else min(1.0, center + half_width)
+    return (float(low), float(high))
+
+
+def evaluate_policy(env, policy: np.ndarray, n_rollouts: int = 100_000, max_steps: int | None = None,
+                    seed=None, batch_size: int = 1 << 18, confidence: float = 0.95) -> EvaluationResult:
+    """Rolls out `policy` from env.start `n_rollouts` times under the slippery dynamics.
+
+    All rollouts of a batch advance together through TransitionModel.sample_next_states,
+    and rollouts leave the batch as soon as they reach the goal.
+
+    Args:
+        env: The maze environment
+        policy: Action of every state, indexed like env.state_space
+        n_rollouts: Number of rollouts
+        max_steps: Step limit of a rollout, env.max_time by default
+        seed: Seed of the rollouts, batch i draws from the i-th child of SeedSequence(seed)
+        batch_size: Rollouts simulated at once, bounds the memory use
+        confidence: Level of the reported confidence intervals
+    """
+    env = env.unwrapped
+    model = env.get_transition_model()
+    policy = np.asarray(policy)
+    max_steps = env.max_time if max_steps is None else max_steps
+    start = env.state_to_index(env.start)
+
+    steps = np.full(n_rollouts, -1, dtype=np.int64)
+    n_batches = -(-n_rollouts // batch_size)
+    for batch, child in enumerate(np.random.SeedSequence(seed).spawn(n_batches)):
+        rng = np.random.default_rng(child)
+        first = batch * batch_size
+        active = np.arange(first, min(first + batch_size, n_rollouts))
+        states = np.full(len(active), start, dtype=np.int64)
+        if start == model.goal_index:
+            steps[active] = 0
+            continue
+        for step in range(1, max_steps + 1):
+            states = model.sample_next_states(states, policy[states], rng)
+            reached = states == model.goal_index
+            steps[active[reached]] = step
+            active, states = active[~reached], states[~reached]
+            if not len(active):
+                break
+    return EvaluationResult(steps, max_steps, confidence)
+
+
+def evaluate_agent(agent, n_rollouts: int = 100_000, **kwargs) -> EvaluationResult:
+    """Evaluates the greedy policy of any trained agent, see evaluate_policy."""
+    return evaluate_policy(agent.env, agent.greedy_policy(), n_rollouts, **kwargs)
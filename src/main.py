@@ -1,45 +1,116 @@
 # В src/main.py
-from agent import QLearningAgent, ValueIterationAgent, PolicyIterationAgent
+from agent import QLearningAgent, DynaQAgent, ValueIterationAgent, PolicyIterationAgent
 from config import (maze, start, goal, learning_rate,
                     start_epsilon, epsilon_decay,
                     final_epsilon, max_time,
-                    discount_factor, n_episodes, plot_path)
-from environment import MazeEnv
-from trainer import QLearningTrainer, ValueIterationTrainer, PolicyIterationTrainer
-from visualizer import QLearningVisualizer, ValueIterationVisualizer, PolicyIterationVisualizer
-from visualizer.agent_animation import AgentAnimationVisualizer
+                    discount_factor, n_episodes, plot_path,
+                    value_iteration_backend, policy_evaluation, n_envs,
+                    n_workers, parallel_mode, maze_size, maze_method, seed,
+                    checkpoint_every, planning_steps, replay_capacity, jit, compact)
+from environment import MazeEnv, maze_generator
+from profiling import ProfileSession, phase
+from trainer import QLearningTrainer, ValueIterationTrainer, PolicyIterationTrainer, ParallelQLearningTrainer
 import argparse
 import os
 
 if __name__ == "__main__":
-    environment = MazeEnv(maze, start, goal, max_time)
-
     parser = argparse.ArgumentParser(description='Algorithm Choosing...')
     parser.add_argument('--method', type=str, default="q_learning",
                         choices=['q_learning', 'value_iteration', 'policy_iteration'],
                         help="method's name...")
+    parser.add_argument('--n-envs', type=int, default=n_envs,
+                        help="number of Q-learning episodes played in lockstep")
+    parser.add_argument('--workers', type=int, default=n_workers,
+                        help="number of Q-learning worker processes sharing one Q-table")
+    parser.add_argument('--jit', action=argparse.BooleanOptionalAction, default=jit,
+                        help="play Q-learning episodes in a compiled kernel (numba if installed)")
+    parser.add_argument('--planning-steps', type=int, default=planning_steps,
+                        help="Dyna-Q simulated updates per real step, 0 for plain Q-learning")
+    parser.add_argument('--maze-size', type=int, nargs=2, default=maze_size, metavar=('N', 'M'),
+                        help="train on a generated N x M maze instead of config.maze")
+    parser.add_argument('--maze-method', type=str, default=maze_method,
+                        choices=maze_generator.METHODS)
+    parser.add_argument('--seed', type=int, default=seed, help="seed of the maze generator")
+    parser.add_argument('--compact', action=argparse.BooleanOptionalAction, default=compact,
+                        help="compact dtypes for very large mazes (uint8 walls, int32 states, float32 values)")
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help="checkpoint directory, <results folder>/checkpoint by default")
+    parser.add_argument('--checkpoint-every', type=int, default=checkpoint_every,
+                        help="episodes (sweeps, policy iterations) between checkpoints")
+    parser.add_argument('--resume', action='store_true', help="continue from the checkpoint if there is one")
+    parser.add_argument('--evaluate', type=int, default=0, metavar='N',
+                        help="evaluate the trained greedy policy with N Monte Carlo rollouts")
+    parser.add_argument('--profile', action='store_true',
+                        help="time the hot paths and write profile.txt / profile.json to the results folder")
+    parser.add_argument('--cprofile', action='store_true', help="also run cProfile (implies --profile)")
+    parser.add_argument('--tracemalloc', action='store_true', help="also trace memory (implies --profile)")
+    parser.add_argument('--no-plots', action='store_true',
+                        help="headless run: train only, without plots or the animation")
     args = parser.parse_args()
+    if args.planning_steps and args.workers > 1:
+        parser.error("Dyna-Q planning is not supported with --workers")
+    if args.jit and (args.planning_steps or args.workers > 1):
+        parser.error("--jit runs plain single-process Q-learning")
+
+    if args.maze_size is None:
+        environment = MazeEnv(maze, start, goal, max_time, compact=args.compact)
+    else:
+        environment = MazeEnv.random(*args.maze_size, method=args.maze_method, seed=args.seed, max_time=max_time,
+                                     compact=args.compact)
+
+    results_folder = "../results/" + args.method.replace("_", "-")
+    checkpoint = dict(checkpoint_path=args.checkpoint or os.path.join(results_folder, "checkpoint"),
+                      checkpoint_every=args.checkpoint_every)
 
     if args.method == 'value_iteration':
-        agent = ValueIterationAgent(environment, discount_factor=discount_factor)
-        results_folder = "../results/value-iteration"
-        trainer = ValueIterationTrainer(agent, n_episodes)
-        trainer.train()
-        visualizer = ValueIterationVisualizer(agent)
+        agent = ValueIterationAgent(environment, discount_factor=discount_factor,
+                                    backend=value_iteration_backend)
+        trainer = ValueIterationTrainer(agent, n_episodes, **checkpoint)
     elif args.method == 'policy_iteration':
-        agent = PolicyIterationAgent(environment, discount_factor=discount_factor, theta=1e-2)
-        results_folder = "../results/policy-iteration"
-        trainer = PolicyIterationTrainer(agent, n_episodes)
-        trainer.train()
-        visualizer = PolicyIterationVisualizer(agent)
+        agent = PolicyIterationAgent(environment, discount_factor=discount_factor, theta=1e-2,
+                                     evaluation=policy_evaluation)
+        trainer = PolicyIterationTrainer(agent, n_episodes, **checkpoint)
     else:
-        agent = QLearningAgent(environment, learning_rate, start_epsilon,
-                               epsilon_decay, final_epsilon, discount_factor)
-        results_folder = "../results/q-learning"
-        trainer = QLearningTrainer(agent, n_episodes)
-        trainer.train()
-        visualizer = QLearningVisualizer(agent)
-
-    visualizer.display_plots(results_folder)
-    anim = AgentAnimationVisualizer(agent)
-    anim.create_gif(os.path.join(results_folder, "animation.gif"))
\ No newline at end of file
+        metrics_path = os.path.join(results_folder, "metrics")
+        if args.planning_steps:
+            agent = DynaQAgent(environment, learning_rate, start_epsilon,
+                               epsilon_decay, final_epsilon, discount_factor, metrics_path=metrics_path,
+                               planning_steps=args.planning_steps, buffer_capacity=replay_capacity)
+        else:
+            agent = QLearningAgent(environment, learning_rate, start_epsilon, epsilon_decay, final_epsilon,
+                                   discount_factor, metrics_path=metrics_path)
+        if args.workers > 1:
+            trainer = ParallelQLearningTrainer(agent, n_episodes, n_workers=args.workers, mode=parallel_mode,
+                                               **checkpoint)
+        else:
+            trainer = QLearningTrainer(agent, n_episodes, n_envs=args.n_envs, jit=args.jit, **checkpoint)
+
+    profiling = ProfileSession(results_folder, enabled=args.profile or args.cprofile or args.tracemalloc,
+                               cprofile=args.cprofile, trace_memory=args.tracemalloc)
+    with profiling:
+        if args.resume and trainer.resume():
+            print(f"Resuming from {trainer.checkpoint_path} after {trainer.episode} episodes")
+        with phase("train"):
+            trainer.train()
+
+        if args.evaluate:
+            from evaluation import evaluate_agent
+
+            with phase("evaluate"):
+                print(evaluate_agent(agent, args.evaluate, seed=args.seed))
+
+        if not args.no_plots:
+            # matplotlib, pandas and imageio are only imported when something is drawn
+            from visualizer import QLearningVisualizer, ValueIterationVisualizer, PolicyIterationVisualizer
+            from visualizer.agent_animation import AgentAnimationVisualizer
+
+            visualizers = {'q_learning': QLearningVisualizer, 'value_iteration': ValueIterationVisualizer,
+                           'policy_iteration': PolicyIterationVisualizer}
+            with phase("plots"):
+                visualizer = visualizers[args.method](agent)
+                visualizer.display_plots(results_folder)
+            with phase("animation"):
+                anim = AgentAnimationVisualizer(agent)
+                anim.create_gif(os.path.join(results_folder, "animation.gif"))
+    if profiling.enabled:
+        print(f"Profile written to {os.path.join(results_folder, 'profile.txt')}")
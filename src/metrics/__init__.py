@@ -0,0 +1,3 @@
+from .streaming import StreamingMetric
+from .sink import MetricsSink
+from .episode_statistics import RecordEpisodeMetrics
@@ -0,0 +1,14 @@
+import gymnasium as gym
+
+from .sink import MetricsSink
+
+
+class RecordEpisodeMetrics(gym.wrappers.RecordEpisodeStatistics):
+    """RecordEpisodeStatistics that streams episode returns and lengths into a MetricsSink
+    ("return" and "length") instead of keeping them in deques."""
+
+    def __init__(self, env: gym.Env, metrics: MetricsSink):
+        super().__init__(env)
+        self.metrics = metrics
+        self.return_queue = metrics["return"]
+        self.length_queue = metrics["length"]
@@ -0,0 +1,69 @@
+import json
+import os
+
+from .streaming import StreamingMetric
+
+
+class MetricsSink:
+    """Named StreamingMetrics, created on first use with shared settings.
+
+    With a `path`, raw values are flushed there in .npy chunks and every flush also
+    writes summary.json with the running statistics of all metrics.
+    """
+
+    def __init__(self, path: str | None = None, **metric_kwargs):
+        """
+        Args:
+            path: Output directory, None keeps only the in-memory summaries
+            metric_kwargs: window, max_points and chunk_size of every StreamingMetric
+        """
+        # absolute, so that checkpoints don't depend on the working directory
+        self.path = os.path.abspath(path) if path is not None else None
+        self.metric_kwargs = metric_kwargs
+        self.metrics = {}
+
+    def __getitem__(self, name: str) -> StreamingMetric:
+        if name not in self.metrics:
+            self.metrics[name] = StreamingMetric(name, path=self.path, **self.metric_kwargs)
+        return self.metrics[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.metrics
+
+    def log(self, name: str, value: float):
+        self[name].append(value)
+
+    def log_batch(self, name: str, values):
+        self[name].extend(values)
+
+    def summary(self) -> dict:
+        return {name: metric.summary() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        summary = self.summary()
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, "summary.json"), "w") as f:
+                json.dump(summary, f, indent=2)
+
+    def merge(self, other: "MetricsSink"):
+        for name, metric in other.metrics.items():
+            self[name].merge(metric)
+
+    def state_dict(self, prefix: str = "metrics.") -> dict:
+        """Flat state of every metric, keyed <prefix><name>.<field>."""
+        return {f"{prefix}{name}.{field}": value
+                for name, metric in self.metrics.items() for field, value in metric.state_dict().items()}
+
+    def load_state_dict(self, state: dict, prefix: str = "metrics."):
+        fields = {}
+        for key, value in state.items():
+            if key.startswith(prefix):
+                name, field = key[len(prefix):].rsplit(".", 1)
+                fields.setdefault(name, {})[field] = value
+        for name, metric_state in fields.items():
+            self[name].load_state_dict(metric_state)
+
+    def prune_chunks(self):
+        for metric in self.metrics.values():
+            metric.prune_chunks()
@@ -0,0 +1,211 @@
+import glob
+import os
+
+import numpy as np
+
+
+class StreamingMetric:
+    """Constant-memory summary of an unbounded stream of scalars.
+
+    Keeps the running count, mean, variance, min and max (Welford / Chan et al.), the last
+    `window` values and a decimated series for plotting: values are averaged in blocks of
+    `stride`, and whenever the series reaches 2 * max_points blocks, neighbouring blocks are
+    merged and the stride doubles. Values are buffered and folded into the statistics
+    `chunk_size` at a time; with a `path`, every such chunk is also written there as
+    <name>-<chunk>.npy.
+
+    `append`, `extend` and `clear` mirror the deques of gym's RecordEpisodeStatistics.
+    """
+
+    def __init__(self, name: str, window: int = 100, max_points: int = 1000,
+                 chunk_size: int = 65536, path: str | None = None):
+        self.name = name
+        self.window = window
+        self.max_points = max_points
+        self.chunk_size = chunk_size
+        self.path = path
+        self._pending = np.empty(chunk_size)
+        self._series = np.empty(2 * max_points)
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+        self._recent = np.zeros(self.window)
+        self._n_points = 0
+        self.stride = 1
+        self._block_sum = 0.0
+        self._block_count = 0
+        self._n_pending = 0
+        self.n_chunks = 0
+
+    def __len__(self):
+        return self.count + self._n_pending
+
+    def append(self, value: float):
+        self._pending[self._n_pending] = value
+        self._n_pending += 1
+        if self._n_pending == self.chunk_size:
+            self.flush()
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        start = 0
+        while start < len(values):
+            take = min(self.chunk_size - self._n_pending, len(values) - start)
+            self._pending[self._n_pending:self._n_pending + take] = values[start:start + take]
+            self._n_pending += take
+            start += take
+            if self._n_pending == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Folds the buffered values into the statistics and writes them out as a chunk."""
+        if not self._n_pending:
+            return
+        values = self._pending[:self._n_pending]
+        self._combine(len(values), values.mean(), np.square(values - values.mean()).sum(),
+                      values.min(), values.max())
+        self._remember(values)
+        self._add_to_series(values)
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            np.save(self._chunk_file(self.n_chunks), values)
+            self.n_chunks += 1
+        self._n_pending = 0
+
+    def summary(self) -> dict:
+        self.flush()
+        return dict(count=self.count, mean=self._mean, std=float(np.sqrt(self._m2 / self.count)) if self.count else np.nan,
+                    min=float(self._min), max=float(self._max), window_mean=self.window_mean())
+
+    def window_mean(self) -> float:
+        """Mean of the last `window` values."""
+        self.flush()
+        n = min(self.count, self.window)
+        return float(self._recent[self.window - n:].mean()) if n else np.nan
+
+    def recent(self) -> np.ndarray:
+        """The last `window` values, oldest first."""
+        self.flush()
+        return self._recent[self.window - min(self.count, self.window):].copy()
+
+    def series(self) -> tuple[np.ndarray, np.ndarray]:
+        """Block means of the whole stream and the number of values seen at the end of every block."""
+        self.flush()
+        return (np.arange(1, self._n_points + 1) * self.stride, self._series[:self._n_points].copy())
+
+    def load_raw(self) -> np.ndarray:
+        """Reads back every value written to `path`."""
+        self.flush()
+        if self.path is None or not self.n_chunks:
+            return np.empty(0)
+        return np.concatenate([np.load(self._chunk_file(chunk)) for chunk in range(self.n_chunks)])
+
+    def merge(self, other: "StreamingMetric"):
+        """Appends the stream summarized by `other` (e.g. from another process) to this one; `other` is modified."""
+        self.flush()
+        other.flush()
+        self._combine(other.count, other._mean, other._m2, other._min, other._max)
+        self._remember(other.recent())
+
+        while self.stride < other.stride:
+            self._compact()
+        while other.stride < self.stride:
+            other._compact()
+        for point in other._series[:other._n_points]:
+            self._push(point)
+        self._block_sum += other._block_sum
+        self._block_count += other._block_count
+        if self._block_count >= self.stride:
+            self._push(self._block_sum / self._block_count)
+            self._block_sum, self._block_count = 0.0, 0
+
+    def state_dict(self) -> dict:
+        self.flush()
+        return dict(count=self.count, mean=self._mean, m2=self._m2, min=float(self._min), max=float(self._max),
+                    stride=self.stride, block_sum=self._block_sum, block_count=self._block_count,
+                    n_chunks=self.n_chunks, recent=self._recent.copy(), series=self._series[:self._n_points].copy())
+
+    def load_state_dict(self, state: dict):
+        self.clear()
+        self.count, self._mean, self._m2 = state["count"], state["mean"], state["m2"]
+        self._min, self._max = state["min"], state["max"]
+        self.stride, self._block_sum, self._block_count = state["stride"], state["block_sum"], state["block_count"]
+        self.n_chunks = state["n_chunks"]
+        self._recent[:] = state["recent"]
+        self._n_points = len(state["series"])
+        self._series[:self._n_points] = state["series"]
+
+    def prune_chunks(self):
+        """Deletes the chunks written after the loaded state was saved. Only a run that continues
+        from that state may do this (see Trainer.resume): it writes those chunks again."""
+        if self.path is not None:
+            for file in glob.glob(os.path.join(self.path, f"{self.name}-*.npy")):
+                if int(file[:-4].rsplit("-", 1)[1]) >= self.n_chunks:
+                    os.remove(file)
+
+    def _chunk_file(self, chunk):
+        return os.path.join(self.path, f"{self.name}-{chunk:06d}.npy")
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        if not count:
+            return
+        total = self.count + count
+        delta = float(mean) - self._mean
+        self._mean += delta * count / total
+        self._m2 += float(m2) + delta ** 2 * self.count * count / total
+        self.count = total
+        self._min = min(self._min, float(minimum))
+        self._max = max(self._max, float(maximum))
+
+    def _remember(self, values):
+        if len(values) >= self.window:
+            self._recent[:] = values[len(values) - self.window:]
+        else:
+            self._recent = np.concatenate([self._recent[len(values):], values])
+
+    def _add_to_series(self, values):
+        start = 0
+        while start < len(values):
+            if self._block_count:
+                # complete the open block first
+                take = min(self.stride - self._block_count, len(values) - start)
+                self._block_sum += values[start:start + take].sum()
+                self._block_count += take
+                start += take
+                if self._block_count == self.stride:
+                    self._push(self._block_sum / self.stride)
+                    self._block_sum, self._block_count = 0.0, 0
+                continue
+            n_blocks = min((len(values) - start) // self.stride, len(self._series) - self._n_points)
+            if not n_blocks:
+                self._block_sum = values[start:].sum()
+                self._block_count = len(values) - start
+                break
+            blocks = values[start:start + n_blocks * self.stride].reshape(n_blocks, self.stride)
+            self._series[self._n_points:self._n_points + n_blocks] = blocks.mean(axis=1)
+            self._n_points += n_blocks
+            start += n_blocks * self.stride
+            if self._n_points == len(self._series):
+                self._compact()
+
+    def _push(self, value):
+        self._series[self._n_points] = value
+        self._n_points += 1
+        if self._n_points == len(self._series):
+            self._compact()
+
+    def _compact(self):
+        n = self._n_points
+        if n % 2:
+            # an unpaired last block goes back into the open block
+            n -= 1
+            self._block_sum += self._series[n] * self.stride
+            self._block_count += self.stride
+        self._series[:n // 2] = self._series[:n].reshape(-1, 2).mean(axis=1)
+        self._n_points = n // 2
+        self.stride *= 2
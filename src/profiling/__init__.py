@@ -0,0 +1,3 @@
+from .profiler import Profiler
+from .hooks import HOOKS, instrument
+from .session import ProfileSession, phase
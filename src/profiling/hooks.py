@@ -0,0 +1,57 @@
+import importlib
+
+# (module, attribute, phase, counter options) of every instrumented hot path
+HOOKS = [
+    ("environment.environment", "MazeEnv.step", "env.step", dict(counter="steps")),
+    ("environment.environment", "MazeEnv.transition_function", "env.transition_function", {}),
+    ("environment.environment", "MazeEnv.render", "render", {}),
+    ("environment.environment", "MazeEnv.apply_edits", "env.apply_edits", dict(counter="edits")),
+    ("environment.vec_environment", "VecMazeEnv.step", "vec_env.step",
+     dict(counter="steps", count=lambda args, kwargs, result: len(args[1]))),
+    ("environment.transition_model", "TransitionModel.from_env", "model.build", {}),
+    ("agent.maze_agent", "QLearningAgent.update", "agent.update", dict(counter="updates")),
+    ("agent.maze_agent", "QLearningAgent.update_batch", "agent.update_batch",
+     dict(counter="updates", count=lambda args, kwargs, result: len(args[1]))),
+    ("agent.maze_agent", "DynaQAgent.plan", "agent.plan",
+     dict(counter="planning_updates", count=lambda args, kwargs, result: args[1])),
+    ("agent.maze_agent", "ValueIterationAgent.sweep", "value_iteration.sweep",
+     dict(counter="backups", delta="n_backups")),
+    ("agent.maze_agent", "ValueIterationAgent.prioritized_sweeping", "value_iteration.prioritized",
+     dict(counter="backups", delta="n_backups")),
+    ("agent.maze_agent", "ValueIterationAgent.hierarchical_sweeping", "value_iteration.hierarchical",
+     dict(counter="backups", delta="n_backups")),
+    ("agent.maze_agent", "PolicyIterationAgent.policy_evaluation", "policy_iteration.evaluation",
+     dict(counter="policy_evaluations")),
+    ("agent.maze_agent", "PolicyIterationAgent.policy_improvement", "policy_iteration.improvement", {}),
+    ("trainer.maze_trainer", "q_learning_episodes", "q_learning.jit_episodes",
+     dict(counter="steps", count=lambda args, kwargs, result: len(args[7]) * args[4])),
+    ("trainer.trainer", "Trainer._advance", "trainer.advance",
+     dict(counter="episodes", count=lambda args, kwargs, result: args[1])),
+    ("trainer.trainer", "Trainer.save_checkpoint", "checkpoint.save", {}),
+    ("evaluation.monte_carlo", "evaluate_policy", "evaluation.rollouts",
+     dict(counter="rollouts", count=lambda args, kwargs, result: result.n_rollouts)),
+]
+
+
+def instrument(profiler, hooks=HOOKS):
+    """Replaces every hooked function with a version timed by `profiler` and returns a callable
+    that puts the originals back. Nothing is patched until this is called, so uninstrumented
+    runs pay no overhead at all."""
+    patched = []
+    for module_name, attribute, phase, options in hooks:
+        owner = importlib.import_module(module_name)
+        *path, name = attribute.split(".")
+        for part in path:
+            owner = getattr(owner, part)
+        original = owner.__dict__[name]
+        if isinstance(original, (classmethod, staticmethod)):
+            replacement = type(original)(profiler.wrap(original.__func__, phase, **options))
+        else:
+            replacement = profiler.wrap(original, phase, **options)
+        setattr(owner, name, replacement)
+        patched.append((owner, name, original))
+
+    def restore():
+        for owner, name, original in reversed(patched):
+            setattr(owner, name, original)
+    return restore
@@ -0,0 +1,89 @@
+import functools
+import time
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Wall-clock time and call count of named phases, plus free-form counters.
+
+    Phases nest, and the time of a phase includes the phases called inside it.
+    """
+
+    def __init__(self):
+        self.phases = {}  # name -> [calls, seconds]
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.stopped = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.stopped = None
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - started)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def wrap(self, func, phase: str, counter: str | None = None, count=None, delta: str | None = None):
+        """Returns `func` timed as `phase`.
+
+        Args:
+            func: The function or method to time
+            phase: Name of the phase its calls are added to
+            counter: Counter increased on every call
+            count: Function of (args, kwargs, result) giving the increment of `counter`, 1 by default
+            delta: Attribute of the first argument (the instance) whose change during the call is
+                the increment of `counter`, e.g. "n_backups"
+        """
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            before = getattr(args[0], delta) if delta is not None else 0
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            self._add(phase, time.perf_counter() - started)
+            if counter is not None:
+                if delta is not None:
+                    self.count(counter, getattr(args[0], delta) - before)
+                else:
+                    self.count(counter, 1 if count is None else count(args, kwargs, result))
+            return result
+        timed.__wrapped__ = func
+        return timed
+
+    def _add(self, name, seconds):
+        record = self.phases.get(name)
+        if record is None:
+            self.phases[name] = [1, seconds]
+        else:
+            record[0] += 1
+            record[1] += seconds
+
+    def report(self) -> dict:
+        elapsed = (self.stopped or time.perf_counter()) - self.started
+        return dict(elapsed_seconds=elapsed,
+                    phases={name: dict(calls=calls, seconds=seconds, mean_us=seconds / calls * 1e6,
+                                       share=seconds / elapsed)
+                            for name, (calls, seconds) in sorted(self.phases.items(), key=lambda item: -item[1][1])},
+                    counters={name: dict(count=n, per_second=n / elapsed) for name, n in self.counters.items()})
+
+    def format_report(self) -> str:
+        report = self.report()
+        lines = [f"Elapsed {report['elapsed_seconds']:.3f} s", "",
+                 f"{'phase':<32} {'calls':>10} {'total s':>10} {'mean us':>12} {'share':>7}"]
+        for name, phase in report["phases"].items():
+            lines.append(f"{name:<32} {phase['calls']:>10,} {phase['seconds']:>10.3f} "
+                         f"{phase['mean_us']:>12.1f} {phase['share']:>7.1%}")
+        if report["counters"]:
+            lines += ["", f"{'counter':<32} {'count':>14} {'per second':>14}"]
+            for name, counter in report["counters"].items():
+                lines.append(f"{name:<32} {counter['count']:>14,} {counter['per_second']:>14,.0f}")
+        return "\n".join(lines)
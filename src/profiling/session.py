@@ -0,0 +1,94 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import tracemalloc
+from contextlib import nullcontext
+
+from .hooks import instrument
+from .profiler import Profiler
+
+_active = None
+
+
+def phase(name: str):
+    """Times the block as `name` in the running ProfileSession, does nothing without one."""
+    return _active.profiler.phase(name) if _active is not None else nullcontext()
+
+
+class ProfileSession:
+    """Instruments the hot paths (see hooks.HOOKS) for the duration of a with block and writes
+    profile.txt and profile.json to `path` on exit.
+
+    Args:
+        path: Directory of the report, usually the results folder of the run
+        enabled: False makes the session a no-op
+        cprofile: Also run cProfile, its stats go to profile.prof and the top functions to profile.txt
+        trace_memory: Also run tracemalloc and report the peak and the largest allocation sites
+        top: Number of cProfile functions and tracemalloc sites reported
+    """
+
+    def __init__(self, path: str, enabled: bool = True, cprofile: bool = False, trace_memory: bool = False,
+                 top: int = 25):
+        self.path = path
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.top = top
+        self.profiler = None
+        self._restore = None
+        self._cprofile = None
+
+    def __enter__(self):
+        global _active
+        if not self.enabled:
+            return self
+        self.profiler = Profiler()
+        self._restore = instrument(self.profiler)
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        _active = self
+        self.profiler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        if not self.enabled:
+            return
+        _active = None
+        self.profiler.stop()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        memory = self._memory_report() if self.trace_memory else None
+        self._restore()
+        self.write_report(memory)
+
+    def _memory_report(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        sites = tracemalloc.take_snapshot().statistics("lineno")[:self.top]
+        tracemalloc.stop()
+        return dict(current_mb=current / 2 ** 20, peak_mb=peak / 2 ** 20,
+                    top_sites=[dict(site=str(stat.traceback), size_mb=stat.size / 2 ** 20, count=stat.count)
+                               for stat in sites])
+
+    def write_report(self, memory: dict | None = None):
+        os.makedirs(self.path, exist_ok=True)
+        report = self.profiler.report()
+        text = [self.profiler.format_report()]
+        if memory is not None:
+            report["memory"] = memory
+            text += ["", f"Memory: peak {memory['peak_mb']:.1f} MB, {memory['current_mb']:.1f} MB still allocated"]
+            text += [f"{site['size_mb']:>10.2f} MB {site['count']:>10,}  {site['site']}" for site in memory["top_sites"]]
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(os.path.join(self.path, "profile.prof"))
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats("cumulative").print_stats(self.top)
+            text += ["", stream.getvalue()]
+        with open(os.path.join(self.path, "profile.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(self.path, "profile.txt"), "w") as f:
+            f.write("\n".join(text) + "\n")
@@ -0,0 +1,2 @@
+from .policy_server import PolicyServer, NO_ACTION
+from .server import PolicyHTTPServer, LatencyTracker
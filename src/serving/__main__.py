@@ -0,0 +1,20 @@
+import argparse
+import asyncio
+
+from serving import PolicyServer, PolicyHTTPServer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve a checkpointed policy over HTTP')
+    parser.add_argument('--checkpoint', type=str, default="../results/q-learning/checkpoint",
+                        help="checkpoint directory written by main.py")
+    parser.add_argument('--host', type=str, default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=65536, help="states answered by one batched lookup")
+    parser.add_argument('--max-delay', type=float, default=0.0005,
+                        help="seconds a request may wait for others to share its batch")
+    args = parser.parse_args()
+
+    server = PolicyHTTPServer(PolicyServer.from_checkpoint(args.checkpoint), args.host, args.port,
+                              args.max_batch, args.max_delay)
+    print(f"Serving {args.checkpoint} on http://{args.host}:{args.port}")
+    asyncio.run(server.serve_forever())
@@ -0,0 +1,55 @@
+import numpy as np
+
+NO_ACTION = -1
+
+
+class PolicyServer:
+    """Answers action queries for a trained policy from one flat array over all maze cells.
+
+    States are maze coordinates (r, c) or flat cell indices r * m + c. Walls and cells
+    outside the maze map to NO_ACTION.
+    """
+
+    def __init__(self, maze: np.ndarray, policy: np.ndarray):
+        """
+        Args:
+            maze: The maze the policy was trained on (0 - free, 1 - wall)
+            policy: Action of every free cell in row-major order (the order of MazeEnv.state_space)
+        """
+        maze = np.asarray(maze)
+        self.n, self.m = maze.shape
+        free = (maze == 0).ravel()
+        if free.sum() != len(policy):
+            raise ValueError(f"Policy has {len(policy)} actions for {free.sum()} free cells")
+        self.actions = np.full(self.n * self.m, NO_ACTION, dtype=np.int8)
+        self.actions[free] = policy
+
+    @classmethod
+    def from_agent(cls, agent):
+        return cls(agent.env.unwrapped.maze, agent.greedy_policy())
+
+    @classmethod
+    def from_checkpoint(cls, path: str):
+        """Reads the maze and the greedy policy saved by checkpoint.save_agent, without building the agent."""
+        from checkpoint import load_checkpoint
+
+        state = load_checkpoint(path)
+        return cls(state["maze"], state["policy"])
+
+    def get_action(self, state: tuple[int, int]) -> int:
+        row, col = state
+        if 0 <= row < self.n and 0 <= col < self.m:
+            return int(self.actions[row * self.m + col])
+        return NO_ACTION
+
+    def get_actions(self, states: np.ndarray) -> np.ndarray:
+        """Actions of a batch of states, given as an (k, 2) array of coordinates or k flat cell indices."""
+        states = np.asarray(states)
+        if states.ndim == 2:
+            rows, cols = states[:, 0], states[:, 1]
+            inside = (rows >= 0) & (rows < self.n) & (cols >= 0) & (cols < self.m)
+            cells = rows * self.m + cols
+        else:
+            cells = states
+            inside = (cells >= 0) & (cells < len(self.actions))
+        return np.where(inside, self.actions[np.where(inside, cells, 0)], NO_ACTION).astype(np.int8)
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from .policy_server import PolicyServer
+
+
+class LatencyTracker:
+    """Latencies of the last `size` requests in a ring buffer."""
+
+    def __init__(self, size: int = 100_000):
+        self.latencies = np.zeros(size)
+        self.count = 0
+
+    def add(self, seconds: float):
+        self.latencies[self.count % len(self.latencies)] = seconds
+        self.count += 1
+
+    def percentiles(self, q=(50, 99)) -> dict:
+        recent = self.latencies[:min(self.count, len(self.latencies))]
+        if not len(recent):
+            return {f"p{p}_ms": None for p in q}
+        return {f"p{p}_ms": float(value) * 1e3 for p, value in zip(q, np.percentile(recent, q))}
+
+
+class PolicyHTTPServer:
+    """Asyncio HTTP/1.1 endpoint in front of a PolicyServer.
+
+    POST /actions takes either JSON {"states": [[r, c], ...]} and answers {"actions": [...]},
+    or an application/octet-stream body of int32 (r, c) pairs and answers one int8 per state.
+    Concurrent requests are micro-batched: when requests are already queued behind the first one,
+    a batch takes every request that arrived within max_delay seconds of it, up to max_batch
+    states, and answers them with a single vectorized get_actions call. A lone request is
+    answered without waiting. GET /stats reports the request count and the
+    p50 / p99 server-side latency, GET /health answers "ok".
+    """
+
+    def __init__(self, policy: PolicyServer, host: str = "127.0.0.1", port: int = 8000,
+                 max_batch: int = 65536, max_delay: float = 0.0005):
+        self.policy = policy
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.latency = LatencyTracker()
+        self.n_batches = 0
+        self.n_batched_states = 0
+        self._queue = None
+        self._server = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batcher())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def get_actions(self, states: np.ndarray) -> np.ndarray:
+        """Queues `states` for the next batch and waits for their actions."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((states, future))
+        return await future
+
+    async def _run_batcher(self):
+        while True:
+            batch = [await self._queue.get()]
+            n_states = len(batch[0][0])
+            # when other requests are already waiting, let the ones arriving meanwhile join the batch;
+            # a lone request is answered right away
+            if not self._queue.empty():
+                await asyncio.sleep(self.max_delay)
+            while n_states < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                batch.append(item)
+                n_states += len(item[0])
+
+            try:
+                actions = self.policy.get_actions(np.concatenate([states for states, _ in batch]))
+            except Exception as error:
+                # fail this batch's requests, the batcher keeps serving the next ones
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.n_batches += 1
+            self.n_batched_states += n_states
+            start = 0
+            for states, future in batch:
+                if not future.cancelled():
+                    future.set_result(actions[start:start + len(states)])
+                start += len(states)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                    started = time.perf_counter()
+                    method, path, headers, length = self._parse_head(head)
+                except asyncio.IncompleteReadError:
+                    break  # the client hung up between requests
+                except (asyncio.LimitOverrunError, ValueError) as error:
+                    # a malformed or oversized head: the framing of anything that follows can't be trusted,
+                    # answer and hang up
+                    message = "Request head too large" if isinstance(error, asyncio.LimitOverrunError) else str(error)
+                    await self._respond(writer, "400 Bad Request", "application/json",
+                                        json.dumps({"error": message}).encode())
+                    break
+                try:
+                    body = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    break  # the client hung up mid-request
+
+                status, content_type, payload = await self._route(method, path, headers, body)
+                await self._respond(writer, status, content_type, payload)
+                if path == "/actions":
+                    self.latency.add(time.perf_counter() - started)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except ConnectionError:
+            pass  # the client went away, there is nobody left to answer
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes):
+        """Method, path, lower-cased headers and body length of a request head, ValueError if malformed."""
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        parts = request_line.split(" ", 2)
+        if len(parts) != 3:
+            raise ValueError(f"Malformed request line: {request_line!r}")
+        method, path, _ = parts
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise ValueError(f"Invalid Content-Length: {headers['content-length']!r}") from None
+        if length < 0:
+            raise ValueError(f"Invalid Content-Length: {length}")
+        return method, path, headers, length
+
+    @staticmethod
+    async def _respond(writer, status, content_type, payload):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+        await writer.drain()
+
+    async def _route(self, method, path, headers, body):
+        if method == "POST" and path == "/actions":
+            binary = headers.get("content-type") == "application/octet-stream"
+            try:
+                if binary:
+                    states = np.frombuffer(body, dtype=np.int32).reshape(-1, 2)
+                else:
+                    states = np.asarray(json.loads(body)["states"], dtype=np.int64).reshape(-1, 2)
+            except (ValueError, KeyError, TypeError) as error:
+                return "400 Bad Request", "application/json", json.dumps({"error": str(error)}).encode()
+            try:
+                actions = await self.get_actions(states)
+            except Exception as error:
+                return "500 Internal Server Error", "application/json", json.dumps({"error": str(error)}).encode()
+            if binary:
+                return "200 OK", "application/octet-stream", actions.tobytes()
+            return "200 OK", "application/json", json.dumps({"actions": actions.tolist()}).encode()
+        if method == "GET" and path == "/stats":
+            stats = dict(requests=self.latency.count, **self.latency.percentiles(), batches=self.n_batches,
+                         mean_batch_states=self.n_batched_states / self.n_batches if self.n_batches else None)
+            return "200 OK", "application/json", json.dumps(stats).encode()
+        if method == "GET" and path == "/health":
+            return "200 OK", "text/plain", b"ok"
+        return "404 Not Found", "text/plain", b"not found"
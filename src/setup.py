@@ -27,4 +27,5 @@ setup(
     # options
     packages=find_packages(),
     install_requires=requirements,
+    extras_require={'jit': ['numba']},
 )
\ No newline at end of file
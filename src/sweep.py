@@ -0,0 +1,129 @@
+import os
+
+# progress bars from many worker processes only garble the terminal
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+import argparse
+import hashlib
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import config
+from environment import maze_generator
+
+
+def build_maze(size, method, seed):
+    """Returns a generated size x size maze with the start and goal in opposite corners."""
+    from environment import generate_maze
+
+    return generate_maze(size, size, method, seed), (0, 0), (size - 1, size - 1)
+
+
+def make_grid(methods, learning_rates, discount_factors, maze_sizes, seeds, n_episodes, maze_method="kruskal"):
+    """Returns the run specifications of the whole grid, learning rates only vary for Q-learning."""
+    runs = []
+    for method, discount_factor, maze_size, seed in itertools.product(methods, discount_factors, maze_sizes, seeds):
+        for learning_rate in (learning_rates if method == "q_learning" else [None]):
+            runs.append(dict(method=method, learning_rate=learning_rate, discount_factor=discount_factor,
+                             maze_size=maze_size, maze_method=maze_method, seed=seed, n_episodes=n_episodes))
+    return runs
+
+
+def run_id(run):
+    return hashlib.sha1(json.dumps(run, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def run_one(run):
+    """Trains one configuration and returns its metrics."""
+    from agent import QLearningAgent, ValueIterationAgent, PolicyIterationAgent
+    from environment import MazeEnv
+    from trainer import QLearningTrainer, ValueIterationTrainer, PolicyIterationTrainer
+
+    np.random.seed(run["seed"])
+    maze, start, goal = build_maze(run["maze_size"], run["maze_method"], run["seed"])
+    env = MazeEnv(maze, start, goal, config.max_time)
+    env.action_space.seed(run["seed"])
+    metrics = dict(n_states=len(env.state_coords))
+
+    started = time.perf_counter()
+    if run["method"] == "value_iteration":
+        agent = ValueIterationAgent(env, discount_factor=run["discount_factor"],
+                                    backend=config.value_iteration_backend)
+        ValueIterationTrainer(agent, run["n_episodes"]).train()
+        metrics.update(iterations=len(agent.training_deltas), final_delta=agent.training_deltas[-1],
+                       start_value=float(agent.value_function[start]))
+    elif run["method"] == "policy_iteration":
+        agent = PolicyIterationAgent(env, discount_factor=run["discount_factor"], theta=1e-2,
+                                     evaluation=config.policy_evaluation)
+        PolicyIterationTrainer(agent, run["n_episodes"]).train()
+        metrics.update(iterations=len(agent.policy_changes), start_value=float(agent.state_values[start]))
+    else:
+        agent = QLearningAgent(env, run["learning_rate"], config.start_epsilon,
+                               config.start_epsilon / (run["n_episodes"] / 2),
+                               config.final_epsilon, run["discount_factor"])
+        QLearningTrainer(agent, run["n_episodes"], n_envs=config.n_envs).train()
+        metrics.update(iterations=run["n_episodes"],
+                       start_value=float(agent.q_values[env.state_to_index(start)].max()),
+                       mean_return_last_100=agent.metrics["return"].window_mean())
+    metrics["train_seconds"] = time.perf_counter() - started
+    return metrics
+
+
+def load_done(results_path):
+    """Returns the ids of the runs already present in the results file."""
+    done = set()
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["run_id"])
+                except (json.JSONDecodeError, KeyError):
+                    pass  # a line cut short by an interrupted sweep
+    return done
+
+
+def sweep(runs, results_path, jobs):
+    done = load_done(results_path)
+    pending = [run for run in runs if run_id(run) not in done]
+    print(f"{len(runs) - len(pending)} of {len(runs)} runs already done, {len(pending)} to go")
+    if not pending:
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    with open(results_path, "a") as results, ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_one, run): run for run in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            run = futures[future]
+            record = dict(run_id=run_id(run), **run)
+            try:
+                record.update(status="ok", **future.result())
+            except Exception as error:
+                record.update(status="error", error=repr(error))
+            results.write(json.dumps(record) + "\n")
+            results.flush()
+            print(f"[{i}/{len(pending)}] {record['status']} {run}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Grid sweep over methods, hyperparameters, maze sizes and seeds')
+    parser.add_argument('--methods', nargs='+', default=["q_learning", "value_iteration", "policy_iteration"],
+                        choices=['q_learning', 'value_iteration', 'policy_iteration'])
+    parser.add_argument('--learning-rates', nargs='+', type=float, default=[config.learning_rate])
+    parser.add_argument('--discount-factors', nargs='+', type=float, default=[config.discount_factor])
+    parser.add_argument('--maze-sizes', nargs='+', type=int, default=[10])
+    parser.add_argument('--maze-method', type=str, default=config.maze_method,
+                        choices=maze_generator.METHODS)
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0], help="seeds of the maze generator and training")
+    parser.add_argument('--episodes', type=int, default=config.n_episodes,
+                        help="episodes for Q-learning, iteration limit for value iteration")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="runs executed concurrently")
+    parser.add_argument('--results', type=str, default="../results/sweep.jsonl", help="JSON lines results file")
+    args = parser.parse_args()
+
+    grid = make_grid(args.methods, args.learning_rates, args.discount_factors,
+                     args.maze_sizes, args.seeds, args.episodes, args.maze_method)
+    sweep(grid, args.results, args.jobs)
@@ -1,2 +1,3 @@
 from .trainer import Trainer
-from .maze_trainer import QLearningTrainer, ValueIterationTrainer, PolicyIterationTrainer
\ No newline at end of file
+from .maze_trainer import QLearningTrainer, ValueIterationTrainer, PolicyIterationTrainer
+from .parallel_trainer import ParallelQLearningTrainer
\ No newline at end of file
@@ -0,0 +1,131 @@
+import importlib.util
+
+import numpy as np
+
+N_ACTIONS = 5
+# uniforms drawn per step: exploration, random action, slip, slipped-to neighbour
+DRAWS_PER_STEP = 4
+
+
+def _q_learning_episodes(q, neighbors, start, goal, max_time, learning_rate, discount_factor,
+                         epsilons, uniforms, returns, errors):
+    """
+    Epsilon-greedy tabular Q-learning on the slippery maze, one episode per entry of `epsilons`.
+    Written against flat sequences only (q[s * 5 + a], neighbors[s * 4 + k]), so the same code
+    runs compiled by numba on NumPy arrays and interpreted on Python lists.
+    """
+    u = 0
+    e = 0
+    for episode in range(len(epsilons)):
+        epsilon = epsilons[episode]
+        state = start
+        total = 0.0
+        for t in range(max_time):
+            base = state * N_ACTIONS
+            if uniforms[u] < epsilon:
+                action = int(uniforms[u + 1] * N_ACTIONS)
+            else:
+                action = 0
+                for a in range(1, N_ACTIONS):
+                    if q[base + a] > q[base + action]:
+                        action = a
+
+            next_state = state
+            if action != 4:
+                target = neighbors[state * 4 + action]
+                if target >= 0 and uniforms[u + 2] <= 0.85:
+                    next_state = target
+                else:
+                    # blocked or slipped: a uniformly chosen free neighbour, if there is one
+                    n_free = 0
+                    for k in range(4):
+                        if neighbors[state * 4 + k] >= 0:
+                            n_free += 1
+                    if n_free > 0:
+                        pick = int(uniforms[u + 3] * n_free)
+                        for k in range(4):
+                            neighbor = neighbors[state * 4 + k]
+                            if neighbor >= 0:
+                                if pick == 0:
+                                    next_state = neighbor
+                                    break
+                                pick -= 1
+            u += DRAWS_PER_STEP
+
+            reward = 0.0 if next_state == goal else -1.0
+            # episodes end on the time limit, MazeEnv reports it as terminated
+            future_q_value = 0.0
+            if t < max_time - 1:
+                next_base = next_state * N_ACTIONS
+                future_q_value = q[next_base]
+                for a in range(1, N_ACTIONS):
+                    if q[next_base + a] > future_q_value:
+                        future_q_value = q[next_base + a]
+            temporal_difference = reward + discount_factor * future_q_value - q[base + action]
+            q[base + action] += learning_rate * temporal_difference
+            errors[e] = temporal_difference
+            e += 1
+            total += reward
+            state = next_state
+        returns[episode] = total
+
+
+_compiled_episodes = None
+
+
+def numba_available() -> bool:
+    return importlib.util.find_spec("numba") is not None
+
+
+def _compiled_kernel():
+    """The numba-compiled kernel, numba is only imported on the first compiled run."""
+    global _compiled_episodes
+    if _compiled_episodes is None:
+        import numba  # optional, see setup.py extras
+
+        _compiled_episodes = numba.njit(cache=True)(_q_learning_episodes)
+    return _compiled_episodes
+
+
+def q_learning_episodes(q_values: np.ndarray, neighbors: np.ndarray, start: int, goal: int, max_time: int,
+                        learning_rate: float, discount_factor: float, epsilons: np.ndarray, compiled=None):
+    """Plays len(epsilons) Q-learning episodes with the given per-episode epsilons, updating
+    q_values in place. Random numbers come from np.random, so np.random.seed fixes the run.
+
+    Args:
+        q_values: The (n_states, 5) Q-table
+        neighbors: The (n_states, 4) neighbour table of the TransitionModel, -1 for walls
+        start: Index of the start state
+        goal: Index of the goal state
+        max_time: Steps per episode
+        learning_rate: The learning rate
+        discount_factor: The discount factor
+        epsilons: Exploration rate of every episode
+        compiled: Run the numba kernel (True) or the interpreted one (False), None picks numba if installed
+
+    Returns:
+        The return of every episode and the temporal difference of every step
+    """
+    if compiled is None:
+        compiled = numba_available()
+    if compiled and not numba_available():
+        raise ImportError("The compiled Q-learning kernel needs numba, install it with pip install numba")
+    n_episodes = len(epsilons)
+    uniforms = np.random.random(n_episodes * max_time * DRAWS_PER_STEP)
+    returns = np.zeros(n_episodes)
+    errors = np.zeros(n_episodes * max_time)
+    flat_q_values = q_values.reshape(-1)
+    if compiled:
+        _compiled_kernel()(flat_q_values, np.ascontiguousarray(neighbors).reshape(-1), start, goal, max_time,
+                           learning_rate, discount_factor, np.asarray(epsilons, dtype=np.float64),
+                           uniforms, returns, errors)
+        return returns, errors
+
+    # Python lists index several times faster than NumPy arrays from interpreted code
+    q = flat_q_values.tolist()
+    returns_list = [0.0] * n_episodes
+    errors_list = [0.0] * len(errors)
+    _q_learning_episodes(q, neighbors.reshape(-1).tolist(), start, goal, max_time, learning_rate, discount_factor,
+                         list(epsilons), uniforms.tolist(), returns_list, errors_list)
+    flat_q_values[:] = q
+    return np.array(returns_list), np.array(errors_list)
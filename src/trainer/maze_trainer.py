@@ -1,13 +1,45 @@
+import numpy as np
 from tqdm import tqdm
 from trainer import Trainer
-from agent import QLearningAgent, ValueIterationAgent, PolicyIterationAgent
+from agent import QLearningAgent, DynaQAgent, ValueIterationAgent, PolicyIterationAgent
+from environment import VecMazeEnv
+from trainer.jit_episodes import q_learning_episodes
 
 class QLearningTrainer(Trainer):
-    def __init__(self, agent: QLearningAgent, n_episodes: int):
-        super().__init__(agent, n_episodes)
+    def __init__(self, agent: QLearningAgent, n_episodes: int, n_envs: int = 1,
+                 checkpoint_path: str | None = None, checkpoint_every: int = 1000, jit: bool = False,
+                 jit_chunk: int = 1000):
+        """
+        Args:
+            agent: The Q-learning agent
+            n_episodes: The total number of training episodes
+            n_envs: The number of episodes played in lockstep, more than one
+                switches to batched action selection and updates over a VecMazeEnv
+            checkpoint_path: Directory the agent is checkpointed to during training, None disables checkpoints
+            checkpoint_every: Episodes between checkpoints
+            jit: Play whole episodes in a compiled kernel (see jit_episodes), numba-compiled
+                when numba is installed and interpreted otherwise; n_envs is then ignored
+            jit_chunk: Episodes per kernel call, the random numbers of a chunk are drawn up front
+        """
+        super().__init__(agent, n_episodes, checkpoint_path, checkpoint_every)
+        if jit and isinstance(agent, DynaQAgent):
+            raise ValueError("The compiled episode loop has no Dyna-Q planning")
+        self.n_envs = n_envs
+        self.jit = jit
+        self.jit_chunk = jit_chunk
 
     def train(self):
-        for episode in tqdm(range(self.n_episodes)):
+        if self.jit:
+            self._train_compiled()
+        elif self.n_envs > 1:
+            self._train_batched()
+        else:
+            self._train_sequential()
+        self.agent.metrics.flush()
+        self.save_checkpoint()
+
+    def _train_sequential(self):
+        for episode in tqdm(range(self.episode, self.n_episodes), initial=self.episode, total=self.n_episodes):
             obs, info = self.env.reset()
             done = False
 
@@ -24,32 +56,110 @@ class QLearningTrainer(Trainer):
                 obs = next_obs
 
             self.agent.decay_epsilon()
+            self._advance(1)
+
+    def _train_batched(self):
+        vec_envs = {}
+        for first_episode in tqdm(range(self.episode, self.n_episodes, self.n_envs)):
+            n_envs = min(self.n_envs, self.n_episodes - first_episode)
+            if n_envs not in vec_envs:
+                vec_envs[n_envs] = VecMazeEnv(self.env.unwrapped, n_envs)
+                vec_envs[n_envs].reset(seed=int(np.random.randint(2 ** 31)))
+            vec_env = vec_envs[n_envs]
+            states, info = vec_env.reset()
+            returns = np.zeros(n_envs)
+            lengths = np.zeros(n_envs, dtype=np.int64)
+            done = np.zeros(n_envs, dtype=bool)
+
+            # play n_envs episodes side by side, all of them end on the same step
+            while not done.all():
+                actions = self.agent.get_actions(states)
+                next_states, rewards, terminated, truncated, info = vec_env.step(actions)
+
+                # update the agent
+                self.agent.update_batch(states, actions, rewards, terminated, next_states)
+
+                returns += rewards
+                lengths += 1
+                done = terminated | truncated
+                states = next_states
+
+            self.env.return_queue.extend(returns)
+            self.env.length_queue.extend(lengths)
+            for _ in range(n_envs):
+                self.agent.decay_epsilon()
+            self._advance(n_envs)
+
+    def _train_compiled(self):
+        env = self.env.unwrapped
+        neighbors = env.get_transition_model().neighbors
+        start, goal = int(env.state_index[env.start]), int(env.state_index[env.goal])
+        chunk = min(self.jit_chunk, self.checkpoint_every) if self.checkpoint_path is not None else self.jit_chunk
+        with tqdm(initial=self.episode, total=self.n_episodes) as progress:
+            while self.episode < self.n_episodes:
+                n_episodes = min(chunk, self.n_episodes - self.episode)
+                # the epsilons decay_epsilon would give these episodes
+                epsilons = np.maximum(self.agent.final_epsilon,
+                                      self.agent.epsilon - self.agent.epsilon_decay * np.arange(n_episodes))
+                returns, errors = q_learning_episodes(self.agent.q_values, neighbors, start, goal, env.max_time,
+                                                      self.agent.lr, self.agent.discount_factor, epsilons)
+                self.env.return_queue.extend(returns)
+                self.env.length_queue.extend(np.full(n_episodes, env.max_time))
+                self.agent.training_error.extend(errors)
+                self.agent.epsilon = max(self.agent.final_epsilon,
+                                         self.agent.epsilon - self.agent.epsilon_decay * n_episodes)
+                self._advance(n_episodes)
+                progress.update(n_episodes)
 
 
 class ValueIterationTrainer(Trainer):
-    def __init__(self, agent: ValueIterationAgent, n_episodes: int):
-        super().__init__(agent, n_episodes)
+    def __init__(self, agent: ValueIterationAgent, n_episodes: int,
+                 checkpoint_path: str | None = None, checkpoint_every: int = 1000):
+        super().__init__(agent, n_episodes, checkpoint_path, checkpoint_every)
 
     def train(self):
-        # Train the agent
-        for _ in tqdm(range(self.n_episodes)):
-            delta = 0
-            # Iterate through all states
-            for state in self.env.state_space:
-                v = self.agent.value_function[state]
-                # Update the value function with action-value functions
-                self.agent.value_function[state] = self.agent.compute_action_value(state)
-                delta = max(delta, abs(v - self.agent.value_function[state]))
-            # Stop criteria
-            self.agent.training_deltas.append(delta)
-            if delta < self.agent.theta:
+        if self.agent.backend == "prioritized":
+            self._train_prioritized()
+        elif self.agent.backend == "hierarchical":
+            self._train_hierarchical()
+        elif not self.agent.training_deltas or self.agent.training_deltas[-1] >= self.agent.theta:
+            # Train the agent
+            for _ in tqdm(range(self.episode, self.n_episodes)):
+                # Back up all states
+                delta = self.agent.sweep()
+                # Stop criteria
+                self.agent.training_deltas.append(delta)
+                self._advance(1)
+                if delta < self.agent.theta:
+                    break
+        self.save_checkpoint()
+
+    def _train_prioritized(self):
+        # n_episodes sweeps worth of single-state backups, split at the checkpoints
+        n_states = len(self.env.state_coords)
+        chunk = self.checkpoint_every if self.checkpoint_path is not None else self.n_episodes
+        while self.episode < self.n_episodes:
+            sweeps = min(chunk, self.n_episodes - self.episode)
+            backups = self.agent.prioritized_sweeping(max_backups=sweeps * n_states)
+            self._advance(sweeps)
+            if backups < sweeps * n_states:
                 break
 
+    def _train_hierarchical(self):
+        chunk = self.checkpoint_every if self.checkpoint_path is not None else self.n_episodes
+        while self.episode < self.n_episodes and not (self.agent.training_deltas
+                                                       and self.agent.training_deltas[-1] < self.agent.theta):
+            self._advance(self.agent.hierarchical_sweeping(max_sweeps=min(chunk, self.n_episodes - self.episode)))
+
 
 class PolicyIterationTrainer(Trainer):
-    def __init__(self, agent: PolicyIterationAgent, n_episodes: int):
-        super().__init__(agent, n_episodes)
+    def __init__(self, agent: PolicyIterationAgent, n_episodes: int,
+                 checkpoint_path: str | None = None, checkpoint_every: int = 1000):
+        super().__init__(agent, n_episodes, checkpoint_path, checkpoint_every)
 
     def train(self):
-        iterations = self.agent.policy_iteration()
-        print(f"Policy Iteration converged in {iterations} iterations")
\ No newline at end of file
+        chunk = self.checkpoint_every if self.checkpoint_path is not None else None
+        while not self.agent.policy_changes or self.agent.policy_changes[-1] != 0:
+            self._advance(self.agent.policy_iteration(max_iterations=chunk))
+        self.save_checkpoint()
+        print(f"Policy Iteration converged in {len(self.agent.policy_changes)} iterations")
\ No newline at end of file
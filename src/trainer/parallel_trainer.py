@@ -0,0 +1,126 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from trainer import Trainer
+from agent import QLearningAgent
+from environment import MazeEnv
+
+_lock = None
+
+
+def _init_worker(lock):
+    global _lock
+    _lock = lock
+
+
+def _run_worker(shm_name, shape, dtype, env_kwargs, agent_kwargs, n_episodes,
+                mode, sync_every, n_workers, seed):
+    """Plays `n_episodes` episodes against a private MazeEnv, learning into the shared Q-table."""
+    np.random.seed(seed)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared_q_values = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    env = MazeEnv(**env_kwargs)
+    env.action_space.seed(seed)
+    agent = QLearningAgent(env, **agent_kwargs)
+    if mode == "hogwild":
+        # lock-free updates straight into shared memory
+        agent.q_values = shared_q_values
+    else:
+        agent.q_values = shared_q_values.copy()
+        snapshot = agent.q_values.copy()
+
+    for episode in range(n_episodes):
+        obs, info = agent.env.reset()
+        done = False
+        while not done:
+            action = agent.get_action(obs)
+            next_obs, reward, terminated, truncated, info = agent.env.step(action)
+            agent.update(obs, action, reward, terminated, next_obs)
+            done = terminated or truncated
+            obs = next_obs
+        agent.decay_epsilon()
+
+        if mode == "average" and ((episode + 1) % sync_every == 0 or episode + 1 == n_episodes):
+            # fold this worker's share of the change since the last sync into the shared table
+            with _lock:
+                shared_q_values += (agent.q_values - snapshot) / n_workers
+                agent.q_values[:] = shared_q_values
+            snapshot[:] = agent.q_values
+
+    agent.metrics.flush()
+    result = (agent.metrics, agent.epsilon)
+    del agent, shared_q_values
+    shm.close()
+    return result
+
+
+class ParallelQLearningTrainer(Trainer):
+    MODES = ("hogwild", "average")
+
+    def __init__(self, agent: QLearningAgent, n_episodes: int, n_workers: int | None = None,
+                 mode: str = "hogwild", sync_every: int = 100, seed: int = 0,
+                 checkpoint_path: str | None = None, checkpoint_every: int = 1000):
+        """
+        Args:
+            agent: The Q-learning agent, its q_values receive the result of the training
+            n_episodes: The total number of training episodes, split between the workers
+            n_workers: The number of worker processes, all cores by default
+            mode: "hogwild" - workers update the shared Q-table in place without locking,
+                "average" - workers learn on a private copy and every sync_every episodes
+                add 1 / n_workers of their change to the shared table under a lock
+            sync_every: Episodes between synchronisations in the "average" mode
+            seed: Base seed, worker i is seeded with seed + i
+            checkpoint_path: Directory the agent is checkpointed to during training, None disables checkpoints
+            checkpoint_every: Episodes between checkpoints, the workers are joined at every checkpoint
+        """
+        super().__init__(agent, n_episodes, checkpoint_path, checkpoint_every)
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown parallel training mode: {mode}")
+        self.n_workers = n_workers or os.cpu_count()
+        self.mode = mode
+        self.sync_every = sync_every
+        self.seed = seed
+
+    def train(self):
+        env = self.env.unwrapped
+        q_values = self.agent.q_values
+        shm = shared_memory.SharedMemory(create=True, size=q_values.nbytes)
+        try:
+            shared_q_values = np.ndarray(q_values.shape, dtype=q_values.dtype, buffer=shm.buf)
+            shared_q_values[:] = q_values
+            env_kwargs = dict(maze=env.maze, start=env.start, goal=env.goal, max_time=env.max_time)
+            chunk = self.checkpoint_every if self.checkpoint_path is not None else self.n_episodes
+
+            lock = mp.Lock()
+            with mp.Pool(self.n_workers, initializer=_init_worker, initargs=(lock,)) as pool:
+                while self.episode < self.n_episodes:
+                    n_episodes = min(chunk, self.n_episodes - self.episode)
+                    # every worker covers n_workers episodes of the global epsilon schedule per episode it plays
+                    agent_kwargs = dict(learning_rate=self.agent.lr, initial_epsilon=self.agent.epsilon,
+                                        epsilon_decay=self.agent.epsilon_decay * self.n_workers,
+                                        final_epsilon=self.agent.final_epsilon,
+                                        discount_factor=self.agent.discount_factor, dtype=q_values.dtype)
+                    episodes = np.diff(np.linspace(0, n_episodes, self.n_workers + 1).astype(int))
+                    # workers get fresh seeds after every checkpoint
+                    first_seed = self.seed + self.episode // chunk * self.n_workers
+                    tasks = [(shm.name, q_values.shape, q_values.dtype, env_kwargs, agent_kwargs, int(n),
+                              self.mode, self.sync_every, self.n_workers, first_seed + worker)
+                             for worker, n in enumerate(episodes)]
+                    results = pool.starmap(_run_worker, tasks)
+
+                    q_values[:] = shared_q_values
+                    # the workers' raw values are not written out, only their summaries are merged
+                    for metrics, epsilon in results:
+                        self.agent.metrics.merge(metrics)
+                    self.agent.epsilon = min(epsilon for metrics, epsilon in results)
+                    self._advance(n_episodes)
+            del shared_q_values
+        finally:
+            shm.close()
+            shm.unlink()
+        self.agent.metrics.flush()
+        self.save_checkpoint()
@@ -1,16 +1,52 @@
 from agent import Agent
 from abc import ABC, abstractmethod
+from checkpoint import checkpoint_exists, restore_agent, save_agent
 
 class Trainer(ABC):
     def __init__(
             self,
             agent: Agent,
-            n_episodes: int
+            n_episodes: int,
+            checkpoint_path: str | None = None,
+            checkpoint_every: int = 1000
     ):
+        """
+        Args:
+            agent: The agent to train
+            n_episodes: The total number of training episodes (sweeps, iterations)
+            checkpoint_path: Directory the agent is checkpointed to during training, None disables checkpoints
+            checkpoint_every: Episodes (sweeps, iterations) between checkpoints
+        """
         self.agent = agent
         self.env = agent.env
         self.n_episodes = n_episodes
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        # Episodes (sweeps, iterations) done so far, restored by resume
+        self.episode = 0
 
     @abstractmethod
     def train(self):
-        pass
\ No newline at end of file
+        pass
+
+    def resume(self) -> bool:
+        """Restores the agent and the progress from checkpoint_path, returns False if there is no checkpoint yet."""
+        if self.checkpoint_path is None or not checkpoint_exists(self.checkpoint_path):
+            return False
+        self.episode = restore_agent(self.checkpoint_path, self.agent)["episode"]
+        metrics = getattr(self.agent, "metrics", None)
+        if metrics is not None:
+            # the resumed run writes the chunks after the checkpoint again
+            metrics.prune_chunks()
+        return True
+
+    def save_checkpoint(self):
+        if self.checkpoint_path is not None:
+            save_agent(self.checkpoint_path, self.agent, episode=self.episode)
+
+    def _advance(self, episodes: int):
+        """Counts finished episodes and checkpoints whenever a multiple of checkpoint_every is passed."""
+        previous = self.episode
+        self.episode += episodes
+        if self.episode // self.checkpoint_every > previous // self.checkpoint_every:
+            self.save_checkpoint()
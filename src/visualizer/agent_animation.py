@@ -1,57 +1,104 @@
 # В src/visualizer/agent_animation.py
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import imageio
 import numpy as np
 import os
+from PIL import Image
+
+# Frames are rendered as indices into this palette: free, wall, grid, goal, agent
+PALETTE = np.array([
+    (255, 255, 255),
+    (0, 0, 0),
+    (128, 128, 128),
+    (255, 215, 0),
+    (255, 0, 0),
+], dtype=np.uint8)
+FREE, WALL, GRID, GOAL, AGENT = range(len(PALETTE))
+
 
 class AgentAnimationVisualizer:
-    def __init__(self, agent):
+    def __init__(self, agent, image_size=500):
+        """
+        Args:
+            agent: The trained agent
+            image_size: Approximate side of the rendered frames in pixels,
+                every maze cell gets at least one pixel
+        """
         self.agent = agent
         self.env = agent.env
+        self.image_size = image_size
 
-    def simulate_episode(self):
-        states = []
+    def iter_episode(self):
+        """Plays one episode with the agent's policy and yields the visited states."""
         state, _ = self.env.reset()
-        states.append(state)
+        yield state
         done = False
         while not done:
             action = self.agent.get_action(state)
             next_state, reward, terminated, truncated, info = self.env.step(action)
-            states.append(next_state)
+            yield next_state
             done = terminated or truncated
             state = next_state
-        return states
 
-    def draw_maze(self, ax, agent_state):
+    def simulate_episode(self):
+        return list(self.iter_episode())
+
+    def render_background(self):
+        """Rasterizes the static part of the scene (walls, free cells, goal) into an array of palette indices."""
         env = self.env.unwrapped if hasattr(self.env, 'unwrapped') else self.env
-        maze = env.maze.copy().astype(float)
-        for x in range(env.n):
-            for y in range(env.m):
-                if env.maze[x, y] == 1:
-                    ax.add_patch(patches.Rectangle((y, x), 1, 1, facecolor='black'))
-                else:
-                    ax.add_patch(patches.Rectangle((y, x), 1, 1, facecolor='white', edgecolor='gray'))
-        goal_x, goal_y = env.goal
-        ax.add_patch(patches.Rectangle((goal_y, goal_x), 1, 1, facecolor='gold'))
-        agent_x, agent_y = agent_state
-        ax.add_patch(patches.Circle((agent_y + 0.5, agent_x + 0.5), 0.3, color='red'))
-        ax.set_xlim(0, env.m)
-        ax.set_ylim(env.n, 0)
-        ax.axis('off')
+        cell = max(1, self.image_size // max(env.n, env.m))
+        cells = np.where(env.maze == 1, WALL, FREE).astype(np.uint8)
+        cells[env.goal] = GOAL
+        background = np.repeat(np.repeat(cells, cell, axis=0), cell, axis=1)
+        if cell >= 4:
+            # cell borders
+            background[::cell, :][background[::cell, :] != WALL] = GRID
+            background[:, ::cell][background[:, ::cell] != WALL] = GRID
+        return background, cell
 
+    def render_frame(self, background, cell, agent_state, out=None):
+        """Returns a copy of `background` (written into `out` if given) with the agent drawn on its cell."""
+        if out is None:
+            frame = background.copy()
+        else:
+            np.copyto(out, background)
+            frame = out
+        x, y = agent_state
+        # a disc of radius 0.3 cells, as in draw_maze
+        offsets = np.arange(cell) + 0.5 - cell / 2
+        disc = offsets[:, None] ** 2 + offsets[None, :] ** 2 <= (0.3 * cell) ** 2 if cell > 2 else True
+        frame[x * cell:(x + 1) * cell, y * cell:(y + 1) * cell][disc] = AGENT
+        return frame
+
+    def iter_frames(self):
+        """Plays one episode and yields its frames as RGB arrays."""
+        background, cell = self.render_background()
+        for state in self.iter_episode():
+            yield PALETTE[self.render_frame(background, cell, state)]
 
     def create_gif(self, gif_path="agent_animation.gif", interval=0.5):
-        states = self.simulate_episode()
-        images = []
-        for state in states:
-            fig, ax = plt.subplots(figsize=(5, 5))
-            self.draw_maze(ax, state)
-            fig.canvas.draw()
-            w, h = fig.canvas.get_width_height()
-            image = np.frombuffer(fig.canvas.buffer_rgba(), dtype=np.uint8).reshape((h, w, 4))
-            image = image[:, :, :3]
-            images.append(image)
-            plt.close(fig)
-        os.makedirs(os.path.dirname(gif_path), exist_ok=True)
-        imageio.mimsave(gif_path, images, duration=interval)
+        """Renders one episode and streams it frame by frame to `gif_path`.
+
+        GIFs are written by Pillow straight from palette frames, so nothing is quantized
+        and frames are consumed as they are rendered. Other extensions (.mp4, ...) go through
+        imageio and need the imageio-ffmpeg package. `interval` is the frame time in seconds.
+        """
+        if os.path.dirname(gif_path):
+            os.makedirs(os.path.dirname(gif_path), exist_ok=True)
+        if not gif_path.lower().endswith(".gif"):
+            with imageio.get_writer(gif_path, fps=1 / interval) as writer:
+                for frame in self.iter_frames():
+                    writer.append_data(frame)
+            return
+
+        background, cell = self.render_background()
+        palette = PALETTE.ravel().tolist()
+
+        def to_image(state):
+            image = Image.fromarray(self.render_frame(background, cell, state), mode="P")
+            image.putpalette(palette)
+            return image
+
+        states = self.iter_episode()
+        first = to_image(next(states))
+        first.save(gif_path, save_all=True, append_images=(to_image(state) for state in states),
+                   duration=int(interval * 1000), loop=0, optimize=False)
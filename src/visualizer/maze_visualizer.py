@@ -1,8 +1,7 @@
 import matplotlib.patches as patches
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-import seaborn as sns
+from matplotlib.colors import ListedColormap
 import os
 
 from agent import QLearningAgent, ValueIterationAgent, PolicyIterationAgent
@@ -17,15 +16,95 @@ ACTION_ARROWS = {
     4: "•"  # Stay
 }
 
+# Arrow direction of every action in (column, row) data coordinates, Stay is drawn as a dot
+ACTION_VECTORS = np.array([(0, -1), (0, 1), (-1, 0), (1, 0), (0, 0)], dtype=float)
+
+
+def to_grid(env, state_array: np.ndarray, fill) -> np.ndarray:
+    """Scatters an array indexed like env.state_space onto an (n, m) grid, walls get `fill`."""
+    grid = np.full((env.n, env.m), fill, dtype=np.result_type(state_array, np.asarray(fill)))
+    rows, cols = env.state_coords.T
+    grid[rows, cols] = state_array
+    return grid
+
+
+def policy_dataframes(action_grid: np.ndarray, value_grid: np.ndarray, value_column: str):
+    """Builds the per-cell policy ("#" for walls) and value (NaN for walls) DataFrames."""
+    import pandas as pd
+
+    n, m = action_grid.shape
+    x, y = np.repeat(np.arange(n), m), np.tile(np.arange(m), n)
+    arrows = np.array([ACTION_ARROWS[action] for action in range(len(ACTION_ARROWS))] + ["#"])
+    df_policy = pd.DataFrame({"X": x, "Y": y, "Action": arrows[action_grid.ravel()]})
+    df_values = pd.DataFrame({"X": x, "Y": y, value_column: value_grid.ravel()})
+    return df_policy, df_values
+
+
+class PolicyGrids:
+    """Greedy action grid (-1 for walls), value grid (NaN for walls) and wall mask of a trained agent.
+
+    The DataFrames df_policy and df_values are only built when first accessed.
+    """
+    value_column = "Value"
+
+    def extract_grids(self, env, policy: np.ndarray, values: np.ndarray):
+        self.wall_mask = env.maze == 1
+        self.action_grid = to_grid(env, policy, -1)
+        self.value_grid = to_grid(env, values.astype(float), np.nan)
+        self._dataframes = None
+
+    def _get_dataframes(self):
+        if self._dataframes is None:
+            self._dataframes = policy_dataframes(self.action_grid, self.value_grid, self.value_column)
+        return self._dataframes
+
+    @property
+    def df_policy(self):
+        return self._get_dataframes()[0]
+
+    @property
+    def df_values(self):
+        return self._get_dataframes()[1]
+
+
+def plot_policy(ax: plt.Axes, env, values: np.ndarray, actions: np.ndarray, cmap="Greens", max_arrows=50):
+    """Draws a value heatmap, the walls, the goal and the greedy policy from whole (n, m) grids.
+
+    Cells span [y, y + 1] x [x, x + 1] in data coordinates. Walls are a masked layer of the same
+    image stack and the policy is a single quiver, thinned to at most max_arrows per side.
+    """
+    walls = env.maze == 1
+    extent = (0, env.m, env.n, 0)
+    heatmap = ax.imshow(np.ma.masked_array(values, mask=walls | np.isnan(values)), cmap=cmap,
+                        extent=extent, interpolation="nearest")
+    plt.colorbar(heatmap, ax=ax)
+    ax.imshow(np.ma.masked_array(walls, mask=~walls), cmap=ListedColormap(["black"]),
+              extent=extent, interpolation="nearest")
+    goal_x, goal_y = env.goal
+    ax.add_patch(patches.Rectangle((goal_y, goal_x), 1, 1, facecolor='gold', edgecolor='black'))
+
+    stride = int(np.ceil(max(env.n, env.m) / max_arrows))
+    sampled = actions[::stride, ::stride]
+    x, y = np.nonzero(sampled >= 0)
+    sampled = sampled[x, y]
+    x, y = x * stride + 0.5, y * stride + 0.5
+    moves = sampled != 4
+    vectors = ACTION_VECTORS[sampled[moves]] * 0.6 * stride
+    ax.quiver(y[moves], x[moves], vectors[:, 0], vectors[:, 1], color='red',
+              angles='xy', scale_units='xy', scale=1, pivot='middle')
+    ax.scatter(y[~moves], x[~moves], color='red', s=16)
+    ax.set_xlim(0, env.m)
+    ax.set_ylim(env.n, 0)
+
+
+class QLearningVisualizer(Visualizer, PolicyGrids):
+    value_column = "Q_Value"
 
-class QLearningVisualizer(Visualizer):
     def __init__(
             self,
             agent: QLearningAgent):
         super().__init__(agent)
         self.env = agent.env.unwrapped
-        self.df_q_values = None
-        self.df_policy = None
         self.extract_q_policy()
 
     def display_plots(self, plot_path=None):
@@ -40,24 +119,12 @@ class QLearningVisualizer(Visualizer):
             plt.savefig(plot_path + "/results.png")
 
     def extract_q_policy(self):
-        """Extracts the best action and Q-values from Q-table for each state."""
-        policy_data = []
-        q_values_data = []
-        for x in range(self.env.n):
-            for y in range(self.env.m):
-                state = (x, y)
-                if self.agent.env.unwrapped.maze[x, y] == 1:
-                    best_action = "#"  # Wall
-                    best_q_value = None
-                else:
-                    best_action_idx = np.argmax(self.agent.q_values[state])
-                    best_action = ACTION_ARROWS[best_action_idx]
-                    best_q_value = np.max(self.agent.q_values[state])
-                policy_data.append([x, y, best_action])
-                q_values_data.append([x, y, best_q_value])
-
-        self.df_policy = pd.DataFrame(policy_data, columns=["X", "Y", "Action"])
-        self.df_q_values = pd.DataFrame(q_values_data, columns=["X", "Y", "Q_Value"])
+        """Extracts the best action and Q-value of every state from the Q-table."""
+        self.extract_grids(self.env, self.agent.greedy_policy(), self.agent.greedy_values())
+
+    @property
+    def df_q_values(self):
+        return self.df_values
 
     def plot_results(self, ax: plt.Axes):
         """Plots the final maze state and overlays Q-values with learned policy on one heatmap."""
@@ -76,39 +143,16 @@ class QLearningVisualizer(Visualizer):
         ax[0].axis("off")
         ax[0].set_title("Last Frame")
 
-        df_q_values_pivot = self.df_q_values.pivot(index="X", columns="Y", values="Q_Value")
-
-        # Draw Q-values as heatmap
-        sns.heatmap(df_q_values_pivot, cmap="Greens", annot=False, linewidths=0.5, linecolor='black', ax=ax[1],
-                    cbar=True)
-
-        # Overlay walls, goal, and arrows
-        for x in range(self.env.n):
-            for y in range(self.env.m):
-                if self.env.maze[x, y] == 1:
-                    rect = patches.Rectangle((y, x), 1, 1, facecolor='black', edgecolor='black')
-                    ax[1].add_patch(rect)
-                elif (x, y) == self.env.goal:
-                    rect = patches.Rectangle((y, x), 1, 1, facecolor='gold', edgecolor='black')
-                    ax[1].add_patch(rect)
-
-        # Draw policy arrows
-        for _, row in self.df_policy.iterrows():
-            x, y, action = row
-            if action != "#":  # Ignore walls
-                ax[1].text(y + 0.5, x + 0.5, action, ha='center', va='center', fontsize=16, color='red')
-
+        plot_policy(ax[1], self.env, self.value_grid, self.action_grid)
         ax[1].set_title("Learned Q-values & Policy")
         return ax
 
 
-class ValueIterationVisualizer(Visualizer):
+class ValueIterationVisualizer(Visualizer, PolicyGrids):
     def __init__(self, agent: ValueIterationAgent):
         super().__init__(agent)
         self.agent = agent
         self.env = agent.env
-        self.df_state_values = None
-        self.df_policy = None
         self.extract_policy()
 
     def display_plots(self, plot_path=None):
@@ -129,59 +173,25 @@ class ValueIterationVisualizer(Visualizer):
             plt.savefig(os.path.join(plot_path, "training.png"))
 
     def extract_policy(self):
-        policy_data = []
-        values_data = []
-        for x in range(self.env.n):
-            for y in range(self.env.m):
-                state = (x, y)
-                if self.env.maze[x, y] == 1:
-                    best_action = "#"  # Стена
-                    value = None
-                else:
-                    best_action_idx = self.agent.get_action(state)
-                    best_action = ACTION_ARROWS[best_action_idx]
-                    value = self.agent.value_function[state]
-                policy_data.append([x, y, best_action])
-                values_data.append([x, y, value])
-        self.df_policy = pd.DataFrame(policy_data, columns=["X", "Y", "Action"])
-        self.df_state_values = pd.DataFrame(values_data, columns=["X", "Y", "Value"])
+        self.extract_grids(self.env, self.agent.greedy_policy(), self.agent.greedy_values())
+
+    @property
+    def df_state_values(self):
+        return self.df_values
 
     def plot_results(self, ax: plt.Axes):
         env = self.env.unwrapped if hasattr(self.env, 'unwrapped') else self.env
-        display_maze = env.maze.copy().astype(float)
-        display_maze[env.maze == 1] = -100  # walls
-        display_maze[env.state] = 100  # agent's position
-        display_maze[env.goal] = 200  # goal
-
+        plot_policy(ax, env, self.value_grid, self.action_grid)
         agent_x, agent_y = env.state
-        triangle = patches.RegularPolygon((agent_y, agent_x), numVertices=3, radius=0.3, color='red')
-
-        ax.imshow(display_maze)
-        ax.add_patch(triangle)
+        ax.add_patch(patches.RegularPolygon((agent_y + 0.5, agent_x + 0.5), numVertices=3, radius=0.3, color='red'))
         ax.axis("off")
-        ax.set_title("Final State")
-
-        for x in range(env.n):
-            for y in range(env.m):
-                if env.maze[x, y] == 1:
-                    rect = patches.Rectangle((y, x), 1, 1, facecolor='black', edgecolor='black')
-                    ax.add_patch(rect)
-                elif (x, y) == env.goal:
-                    rect = patches.Rectangle((y, x), 1, 1, facecolor='gold', edgecolor='black')
-                    ax.add_patch(rect)
-        for _, row in self.df_policy.iterrows():
-            x, y, action = row
-            if action != "#":
-                ax.text(y + 0.5, x + 0.5, action, ha='center', va='center', fontsize=16, color='red')
         ax.set_title("Learned State Values & Policy")
 
 
-class PolicyIterationVisualizer:
+class PolicyIterationVisualizer(PolicyGrids):
     def __init__(self, agent: PolicyIterationAgent):
         self.agent = agent
         self.env = agent.env
-        self.df_state_values = None
-        self.df_policy = None
         self.extract_policy()
 
     def display_plots(self, plot_path=None):
@@ -201,47 +211,16 @@ class PolicyIterationVisualizer:
             plt.savefig(os.path.join(plot_path, "training.png"))
 
     def extract_policy(self):
-        policy_data = []
-        values_data = []
-        for x in range(self.env.n):
-            for y in range(self.env.m):
-                state = (x, y)
-                if self.env.maze[x, y] == 1:
-                    best_action = "#"  # Стена
-                    value = None
-                else:
-                    best_action = ACTION_ARROWS[self.agent.policy.get(state, 4)]
-                    value = self.agent.state_values.get(state, 0)
-                policy_data.append([x, y, best_action])
-                values_data.append([x, y, value])
-        self.df_policy = pd.DataFrame(policy_data, columns=["X", "Y", "Action"])
-        self.df_state_values = pd.DataFrame(values_data, columns=["X", "Y", "Value"])
+        self.extract_grids(self.env, self.agent.greedy_policy(), self.agent.greedy_values())
+
+    @property
+    def df_state_values(self):
+        return self.df_values
 
     def plot_results(self, ax: plt.Axes):
         env = self.env.unwrapped if hasattr(self.env, 'unwrapped') else self.env
-        display_maze = env.maze.copy().astype(float)
-        display_maze[env.maze == 1] = -100
-        display_maze[env.state] = 100
-        display_maze[env.goal] = 200
-
+        plot_policy(ax, env, self.value_grid, self.action_grid)
         agent_x, agent_y = env.state
-        triangle = patches.RegularPolygon((agent_y, agent_x), numVertices=3, radius=0.3, color='red')
-
-        ax.imshow(display_maze)
-        ax.add_patch(triangle)
+        ax.add_patch(patches.RegularPolygon((agent_y + 0.5, agent_x + 0.5), numVertices=3, radius=0.3, color='red'))
         ax.axis("off")
-        ax.set_title("Final State")
-
-        for x in range(env.n):
-            for y in range(env.m):
-                if env.maze[x, y] == 1:
-                    rect = patches.Rectangle((y, x), 1, 1, facecolor='black', edgecolor='black')
-                    ax.add_patch(rect)
-                elif (x, y) == env.goal:
-                    rect = patches.Rectangle((y, x), 1, 1, facecolor='gold', edgecolor='black')
-                    ax.add_patch(rect)
-        for _, row in self.df_policy.iterrows():
-            x, y, action = row
-            if action != "#":
-                ax.text(y + 0.5, x + 0.5, action, ha='center', va='center', fontsize=16, color='red')
         ax.set_title("Learned State Values & Policy")
@@ -1,5 +1,4 @@
 import matplotlib.pyplot as plt
-import numpy as np
 import os
 
 from agent import Agent
@@ -24,19 +23,15 @@ class Visualizer:
             plt.savefig(os.path.join(plot_path, "training.png"))
 
     def plot_training(self, ax: plt.Axes):
-        ax[0].plot(np.convolve(self.wrapped_env.return_queue, np.ones(100))[100:-100])
-        ax[0].set_title("Episode Rewards")
-        ax[0].set_xlabel("Episode")
-        ax[0].set_ylabel("Reward")
-
-        ax[1].plot(np.convolve(self.wrapped_env.length_queue, np.ones(100))[100:-100])
-        ax[1].set_title("Episode Lengths")
-        ax[1].set_xlabel("Episode")
-        ax[1].set_ylabel("Length")
-
-        ax[2].plot(np.convolve(self.agent.training_error, np.ones(100))[100:-100])
-        ax[2].set_title("Training Error")
-        ax[2].set_xlabel("Episode")
-        ax[2].set_ylabel("Temporal Difference")
-
-        return ax
\ No newline at end of file
+        # block means of the streamed metrics, see metrics.StreamingMetric.series
+        metrics = self.agent.metrics
+        panels = (("return", "Episode Rewards", "Episode", "Reward"),
+                  ("length", "Episode Lengths", "Episode", "Length"),
+                  ("training_error", "Training Error", "Step", "Temporal Difference"))
+        for axis, (name, title, xlabel, ylabel) in zip(ax, panels):
+            axis.plot(*metrics[name].series())
+            axis.set_title(title)
+            axis.set_xlabel(xlabel)
+            axis.set_ylabel(ylabel)
+
+        return ax